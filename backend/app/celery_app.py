@@ -1,4 +1,5 @@
 from celery import Celery  # type: ignore
+from kombu import Queue  # type: ignore
 from .config import settings
 
 celery_app = Celery(
@@ -15,4 +16,20 @@ celery_app.conf.update(
     timezone="UTC",
     task_acks_late=True,
     worker_max_tasks_per_child=100,
+    # Files séparées: un worker par file, scalables indépendamment
+    task_queues=(
+        Queue(settings.dataset_queue_small),
+        Queue(settings.dataset_queue_large),
+    ),
+    task_default_queue=settings.dataset_queue_small,
+    # Route par défaut; l'upload choisit la file selon la taille du fichier
+    task_routes={
+        "datasets.process_csv": {"queue": settings.dataset_queue_small},
+        "datasets.purge": {"queue": settings.dataset_queue_small},
+        # requêtes interactives: file rapide
+        "datasets.query": {"queue": settings.dataset_queue_small},
+    },
+    # Tâches longues: pas de préchargement de messages derrière une analyse
+    worker_prefetch_multiplier=settings.celery_prefetch_multiplier,
+    task_reject_on_worker_lost=True,
 )
@@ -42,6 +42,81 @@ class Settings(BaseSettings):
     # -------------------------
     redis_url: str = Field(default="redis://ia_redis:6379/0", env="REDIS_URL")
 
+    # Files d'attente Celery (petits fichiers rapides vs gros fichiers longs)
+    dataset_queue_small: str = Field(
+        default="datasets_small", env="DATASET_QUEUE_SMALL")
+    dataset_queue_large: str = Field(
+        default="datasets_large", env="DATASET_QUEUE_LARGE")
+    # Au-delà de l'un de ces seuils, le dataset part dans la file "large"
+    large_dataset_min_bytes: int = Field(
+        default=5 * 1024 * 1024, env="LARGE_DATASET_MIN_BYTES")
+    large_dataset_min_rows: int = Field(
+        default=10000, env="LARGE_DATASET_MIN_ROWS")
+    # Tâches longues: 1 seul message réservé par process worker
+    celery_prefetch_multiplier: int = Field(
+        default=1, env="CELERY_PREFETCH_MULTIPLIER")
+    # Équité: nombre max de datasets en cours de traitement par utilisateur
+    max_inflight_datasets_per_user: int = Field(
+        default=3, env="MAX_INFLIGHT_DATASETS_PER_USER")
+
+    # Traitement CSV: reprises (backoff) depuis le dernier checkpoint
+    process_max_retries: int = Field(default=3, env="PROCESS_MAX_RETRIES")
+
+    # Purge asynchrone des datasets archivés (HDFS + Mongo)
+    purge_max_retries: int = Field(default=8, env="PURGE_MAX_RETRIES")
+    # Datasets archivés encore en traitement: nouvelle tentative après ce délai
+    # (replanifiée hors budget PURGE_MAX_RETRIES, le traitement peut être long)
+    purge_running_recheck_seconds: int = Field(
+        default=60, env="PURGE_RUNNING_RECHECK_SECONDS")
+    bulk_archive_max_items: int = Field(
+        default=500, env="BULK_ARCHIVE_MAX_ITEMS")
+
+    # Cache Redis du détail dataset (payload sérialisé + ETag)
+    detail_cache_ttl_seconds: int = Field(
+        default=86400, env="DETAIL_CACHE_TTL_SECONDS")
+
+    # Stockage des analyses: au-delà de N colonnes, stats par colonne en collection annexe
+    analysis_inline_max_columns: int = Field(
+        default=500, env="ANALYSIS_INLINE_MAX_COLUMNS")
+    analysis_stats_chunk_size: int = Field(
+        default=1000, env="ANALYSIS_STATS_CHUNK_SIZE")
+
+    # Téléchargement des datasets (streaming depuis WebHDFS)
+    download_chunk_size: int = Field(
+        default=1024 * 1024, env="DOWNLOAD_CHUNK_SIZE")
+    max_concurrent_downloads_per_user: int = Field(
+        default=2, env="MAX_CONCURRENT_DOWNLOADS_PER_USER")
+    # Un slot non libéré (client coupé) expire au bout de ce délai
+    download_slot_ttl_seconds: int = Field(
+        default=3600, env="DOWNLOAD_SLOT_TTL_SECONDS")
+
+    # Requêtes ad-hoc sur les datasets (résultats mis en cache par hash de requête)
+    query_max_result_rows: int = Field(
+        default=10000, env="QUERY_MAX_RESULT_ROWS")
+    query_max_page_size: int = Field(default=1000, env="QUERY_MAX_PAGE_SIZE")
+    query_cache_ttl_seconds: int = Field(
+        default=86400, env="QUERY_CACHE_TTL_SECONDS")
+
+    # Hachage des mots de passe (bcrypt, pool dédié borné)
+    # Coût fixe, identique sur toutes les instances (12 = défaut historique de bcrypt)
+    bcrypt_rounds: int = Field(default=12, env="BCRYPT_ROUNDS")
+    # Calibration optionnelle: relève le coût tant qu'un hachage tient dans
+    # BCRYPT_TARGET_MS (jamais en dessous de BCRYPT_ROUNDS)
+    bcrypt_calibrate: bool = Field(default=False, env="BCRYPT_CALIBRATE")
+    bcrypt_target_ms: int = Field(default=250, env="BCRYPT_TARGET_MS")
+    bcrypt_workers: int | None = Field(default=None, env="BCRYPT_WORKERS")
+    bcrypt_max_pending: int = Field(default=64, env="BCRYPT_MAX_PENDING")
+    # Proxys de confiance (IP ou CIDR, séparés par des virgules) dont on lit
+    # X-Forwarded-For pour retrouver l'IP du client (ex: nginx /api/ du front).
+    # Vide = on ne lit jamais l'en-tête (il serait falsifiable par le client).
+    # N'y mettre que l'adresse du proxy, pas un sous-réseau entier: une requête
+    # directe venant de la passerelle Docker pourrait sinon forger l'en-tête.
+    trusted_proxies_csv: str = Field(default="", env="TRUSTED_PROXIES_CSV")
+    # Limitation des tentatives de login par IP (fenêtre fixe)
+    login_rate_limit: int = Field(default=20, env="LOGIN_RATE_LIMIT")
+    login_rate_window_seconds: int = Field(
+        default=60, env="LOGIN_RATE_WINDOW_SECONDS")
+
     flower_user: str | None = Field(default=None, env="FLOWER_USER")
     flower_password: str | None = Field(default=None, env="FLOWER_PASSWORD")
     flower_host: str = Field(default="ia_flower", env="FLOWER_HOST")
@@ -90,6 +165,37 @@ class Settings(BaseSettings):
     hdfs_user: str = Field(default="hdfs", env="HDFS_USER")
     hdfs_admin_user: str = Field(default="root", env="HDFS_ADMIN_USER")
 
+    # Profil Spark adaptatif (None = choisi selon taille du fichier / nb de colonnes)
+    spark_shuffle_partitions: int | None = Field(
+        default=None, env="SPARK_SHUFFLE_PARTITIONS")
+    spark_adaptive_enabled: bool | None = Field(
+        default=None, env="SPARK_ADAPTIVE_ENABLED")
+    # (None = budget worker - part Python, fixe pour le process)
+    spark_driver_memory: str | None = Field(
+        default=None, env="SPARK_DRIVER_MEMORY")
+    spark_cache_dataframe: bool | None = Field(
+        default=None, env="SPARK_CACHE_DATAFRAME")
+    # Budget mémoire par tâche d'analyse (process worker + JVM Spark locale)
+    worker_memory_budget_mb: int = Field(
+        default=2048, env="WORKER_MEMORY_BUDGET_MB")
+    # Corrélations: nombre max de colonnes numériques (n*(n-1)/2 agrégats en une passe)
+    analysis_max_corr_columns: int = Field(
+        default=50, env="ANALYSIS_MAX_CORR_COLUMNS")
+    # "exact" | "approx" (None = choisi selon l'empreinte estimée vs budget)
+    analysis_strategy: str | None = Field(
+        default=None, env="ANALYSIS_STRATEGY")
+
+    # Client WebHDFS mutualisé (sessions HTTP keep-alive par utilisateur HDFS)
+    hdfs_pool_maxsize: int = Field(default=16, env="HDFS_POOL_MAXSIZE")
+    hdfs_timeout_seconds: int = Field(default=30, env="HDFS_TIMEOUT_SECONDS")
+    # Écriture parallèle par blocs (concaténés ensuite) au-delà de ce seuil
+    hdfs_parallel_write_min_bytes: int = Field(
+        default=256 * 1024 * 1024, env="HDFS_PARALLEL_WRITE_MIN_BYTES")
+    hdfs_parallel_write_workers: int = Field(
+        default=4, env="HDFS_PARALLEL_WRITE_WORKERS")
+    hdfs_block_size: int = Field(
+        default=128 * 1024 * 1024, env="HDFS_BLOCK_SIZE")
+
     # Limite de lignes CSV
     max_csv_rows: int = Field(default=20000, env="MAX_CSV_ROWS")
 
@@ -131,5 +237,9 @@ class Settings(BaseSettings):
     def cors_origins(self) -> list[str]:
         return [o.strip() for o in self.cors_origins_csv.split(",") if o.strip()]
 
+    @property
+    def trusted_proxies(self) -> list[str]:
+        return [p.strip() for p in self.trusted_proxies_csv.split(",") if p.strip()]
+
 
 settings = Settings()
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException  # type: ignore
+from fastapi import APIRouter, Depends, HTTPException, Request  # type: ignore
+from fastapi.concurrency import run_in_threadpool  # type: ignore
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm  # type: ignore
 from pydantic import BaseModel  # type: ignore
 from bson import ObjectId  # type: ignore
 from .. import db
-from ..services.encrypt import verify_password
+from ..config import settings
+from ..enums.role_enum import Role
+from ..services.encrypt import HashingBusy, hash_password_async, needs_rehash, verify_password_async
 from ..services.auth import create_access_token, decode_access_token
+from ..services.client_ip import client_ip
+from ..services.limits import hit_rate_limit
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -17,11 +22,43 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user.get("password", "")):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    # async: bcrypt tourne dans son propre pool (services/encrypt), Mongo/Redis
+    # dans le threadpool; le login n'y occupe donc pas un thread pendant le hachage
+    # IP réelle derrière nginx (X-Forwarded-For des proxys de TRUSTED_PROXIES_CSV)
+    ip = client_ip(request)
+    allowed = await run_in_threadpool(
+        hit_rate_limit, f"login:{ip}", settings.login_rate_limit,
+        settings.login_rate_window_seconds)
+    if not allowed:
+        raise HTTPException(
+            status_code=429, detail="Too many login attempts",
+            headers={"Retry-After": str(settings.login_rate_window_seconds)})
+
+    user = await run_in_threadpool(
+        db.users.find_one, {"email": form_data.username}, {"password": 1})
+    try:
+        valid = bool(user) and await verify_password_async(
+            form_data.password, user.get("password", ""))
+    except HashingBusy:
+        raise HTTPException(
+            status_code=503, detail="Authentication busy, retry later",
+            headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Coût bcrypt modifié (calibration/BCRYPT_ROUNDS): on met le hash à niveau
+    if needs_rehash(user["password"]):
+        try:
+            new_hash = await hash_password_async(form_data.password)
+            await run_in_threadpool(
+                db.users.update_one,
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": new_hash}},
+            )
+        except HashingBusy:
+            pass  # mise à niveau au prochain login
+
     token = create_access_token({"sub": str(user["_id"])})
     return TokenResponse(access_token=token)
 
@@ -37,6 +74,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     return user
 
 
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Dépendance: utilisateur courant, admin uniquement."""
+    if current_user["role"] != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+
 @router.get("/me")
 def me(current_user: dict = Depends(get_current_user)):
     """Retourne les infos de l’utilisateur courant"""
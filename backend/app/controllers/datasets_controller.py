@@ -1,17 +1,42 @@
 import os
+import re
 import uuid
+import weakref
+import zlib
 from enum import Enum
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile  # <-- Form !
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile  # <-- Form !
+from fastapi.concurrency import run_in_threadpool  # type: ignore
+from fastapi.responses import JSONResponse, StreamingResponse  # type: ignore
 from bson import ObjectId
+from pydantic import BaseModel  # type: ignore
 
 from .. import db
 from ..config import settings
 from .auth_controller import get_current_user
 from ..celery_app import celery_app
-from ..services.hdfs_client import get_hdfs_client_as
+from ..services.analysis_store import load_analysis
+from ..services.cache import (
+    CACHEABLE_STATUSES,
+    claim_query,
+    get_cached_detail,
+    get_query_result,
+    get_query_state,
+    invalidate_details,
+    invalidate_queries,
+    serialize_detail,
+    set_cached_detail,
+)
+from ..services.csv_validation import validate_csv
+from ..services.dataset_detail import load_dataset_detail
+from ..services.hdfs_client import get_hdfs_client
+from ..services.limits import acquire_slot, release_slot
+from ..services.query_dsl import DatasetQuery, query_hash, validate_query
+from ..services.queues import count_inflight_datasets, pick_dataset_queue
+from ..services.user_stats import release_archived
 
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
@@ -26,25 +51,21 @@ class DatasetStep(str, Enum):
     INITIAL_ANALYSIS = "initial_analysis"
 
 
+class BulkArchiveRequest(BaseModel):
+    dataset_ids: List[str]
+
+
 STATUS_TO_PROGRESS = {
     "queued": 0,
     "uploading_hdfs": 25,
     "analyzing": 75,
     "done": 100,
     "failed": 100,
+    "cancelled": 100,
 }
 
-
-def _count_csv_rows(path: str) -> int:
-    count = 0
-    last_byte_newline = False
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            count += chunk.count(b"\n")
-            last_byte_newline = chunk.endswith(b"\n")
-    if not last_byte_newline and os.path.getsize(path) > 0:
-        count += 1
-    return count
+# Statuts pendant lesquels la tâche Celery tourne sur un worker
+RUNNING_STATUSES = ["uploading_hdfs", "analyzing"]
 
 
 @router.post("/upload")
@@ -58,6 +79,13 @@ async def upload_dataset(
         raise HTTPException(
             status_code=400, detail="Le fichier doit être un CSV")
 
+    # Équité: un utilisateur ne peut pas remplir la file à lui seul
+    if count_inflight_datasets(ObjectId(current_user["_id"])) >= settings.max_inflight_datasets_per_user:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Trop de datasets en cours de traitement (max {settings.max_inflight_datasets_per_user})",
+        )
+
     # Sauvegarde temporaire (volume partagé backend/worker)
     ext = ".csv" if not file.filename.lower().endswith(".csv") else ""
     tmp_name = f"{uuid.uuid4().hex}{ext}"
@@ -69,8 +97,23 @@ async def upload_dataset(
                 break
             out.write(chunk)
 
+    # Validation structurelle (encodage, séparateur, nb de champs, guillemets)
+    # avant toute mise en file: les erreurs sont renvoyées ligne par ligne.
+    # Lecture de tout le fichier: hors de la boucle asyncio (threadpool)
+    report = await run_in_threadpool(validate_csv, tmp_path)
+    if report["errors"]:
+        os.remove(tmp_path)
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "CSV invalide",
+                "delimiter": report["delimiter"],
+                "errors": report["errors"],
+            },
+        )
+
     # Limite de lignes
-    rows = _count_csv_rows(tmp_path)
+    rows = report["row_count"]
     if rows - 1 > settings.max_csv_rows:
         os.remove(tmp_path)
         raise HTTPException(
@@ -78,6 +121,9 @@ async def upload_dataset(
             detail=f"Le CSV dépasse la limite de {settings.max_csv_rows} lignes",
         )
 
+    size_bytes = os.path.getsize(tmp_path)
+    queue = pick_dataset_queue(size_bytes, rows)
+
     # Nom saisi par l'utilisateur (peut être vide) + nom du fichier réel
     custom_name = (dataset_name or "").strip() or None
     filename = file.filename
@@ -98,6 +144,14 @@ async def upload_dataset(
         "column_count": None,
         "hdfs_path": None,
         "error_message": None,
+        "size_bytes": size_bytes,
+        "delimiter": report["delimiter"],
+        "encoding": report["encoding"],
+        "queue": queue,
+        "queued_at": now,
+        "started_at": None,
+        "queue_wait_seconds": None,
+        "archived_at": None,
         "created_at": now,
         "updated_at": now,
     }
@@ -105,14 +159,21 @@ async def upload_dataset(
     dataset_id = str(res.inserted_id)
 
     # Lancement tâche Celery
-    celery_app.send_task(
+    task = celery_app.send_task(
         "datasets.process_csv",
         kwargs={
             "dataset_id": dataset_id,
             "user_id": str(current_user["_id"]),
             "local_path": tmp_path,
             "filename": filename,
+            "delimiter": report["delimiter"],
+            "encoding": report["encoding"],
         },
+        queue=queue,
+    )
+    db.datasets_infos.update_one(
+        {"_id": res.inserted_id},
+        {"$set": {"task_id": task.id, "local_path": tmp_path}},
     )
 
     return {
@@ -126,7 +187,7 @@ async def upload_dataset(
 def list_datasets(current_user: dict = Depends(get_current_user)):
     items = []
     for d in db.datasets_infos.find(
-        {"user_id": ObjectId(current_user["_id"])}
+        {"user_id": ObjectId(current_user["_id"]), "archived_at": None}
     ).sort("created_at", -1):
         # on renvoie aussi filename/custom_name au cas où le front en a besoin
         items.append({
@@ -143,50 +204,64 @@ def list_datasets(current_user: dict = Depends(get_current_user)):
     return {"items": items}
 
 
-@router.get("/{dataset_id}", summary="Détails d'un dataset (info + analyse si dispo)")
-def get_dataset(dataset_id: str, current_user: dict = Depends(get_current_user)):
-    info = db.datasets_infos.find_one(
-        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"])}
-    )
-    if not info:
-        raise HTTPException(status_code=404, detail="Dataset introuvable")
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in candidates
 
-    payload = {
-        "id": str(info["_id"]),
-        # affichage (custom_name ou filename)
-        "name": info.get("name"),
-        "custom_name": info.get("custom_name"),
-        "filename": info.get("filename"),
-        "status": info.get("status"),
-        "step": info.get("step"),
-        "row_count": info.get("row_count"),
-        "column_count": info.get("column_count"),
-        "hdfs_path": info.get("hdfs_path"),
-        "error_message": info.get("error_message"),
-        "created_at": info.get("created_at"),
-        "updated_at": info.get("updated_at"),
-    }
 
-    analysis = db.datasets_initial_analyze.find_one(
-        {"dataset_id": ObjectId(dataset_id),
-         "user_id": ObjectId(current_user["_id"])}
-    )
-    if analysis:
-        a = dict(analysis)
-        a["id"] = str(a.pop("_id"))
-        if isinstance(a.get("dataset_id"), ObjectId):
-            a["dataset_id"] = str(a["dataset_id"])
-        if isinstance(a.get("user_id"), ObjectId):
-            a["user_id"] = str(a["user_id"])
-        payload["analysis"] = a
+def _csv_param(value: Optional[str]) -> List[str] | None:
+    if not value:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()] or None
+
 
-    return payload
+@router.get("/{dataset_id}", summary="Détails d'un dataset (info + analyse si dispo)")
+def get_dataset(
+    dataset_id: str,
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None),
+    fields: Optional[str] = Query(
+        None, description="Champs d'analyse à renvoyer, ex: schema,null_counts"),
+    columns: Optional[str] = Query(
+        None, description="Colonnes à inclure dans les stats, ex: age,ville"),
+):
+    user_id = str(current_user["_id"])
+    field_list = _csv_param(fields)
+    column_list = _csv_param(columns)
+    # Le cache ne contient que le payload complet (sans projection)
+    full_payload = field_list is None and column_list is None
+
+    # Cache Redis (payload déjà sérialisé): aucune requête Mongo si présent.
+    # La génération est lue avant Mongo: si un archivage invalide le détail
+    # pendant la lecture, l'entrée écrite ensuite est périmée d'office.
+    cached, generation = get_cached_detail(
+        user_id, dataset_id) if full_payload else (None, None)
+    if cached is None:
+        payload = load_dataset_detail(
+            db, ObjectId(dataset_id), ObjectId(current_user["_id"]),
+            fields=field_list, columns=column_list)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Dataset introuvable")
+        cached = serialize_detail(payload)
+        if full_payload and payload.get("status") in CACHEABLE_STATUSES:
+            set_cached_detail(user_id, dataset_id, generation, *cached)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/{dataset_id}/status", summary="Statut + progression (0-100)")
 def get_status(dataset_id: str, current_user: dict = Depends(get_current_user)):
     info = db.datasets_infos.find_one(
-        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"])}
+        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"]),
+         "archived_at": None}
     )
     if not info:
         raise HTTPException(status_code=404, detail="Dataset introuvable")
@@ -204,30 +279,331 @@ def get_status(dataset_id: str, current_user: dict = Depends(get_current_user)):
     }
 
 
-@router.delete("/{dataset_id}", summary="Archiver (supprimer DB + HDFS)")
-def archive_dataset(dataset_id: str, current_user: dict = Depends(get_current_user)):
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Renvoie (start, end) inclusifs pour un Range "bytes=..." simple, None si absent.
+    Les plages multiples ne sont pas supportées: on renvoie alors le fichier entier.
+    Lève 416 si la plage est invalide ou hors du fichier.
+    """
+    if not header or "," in header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        raise HTTPException(status_code=416, detail="Range invalide",
+                            headers={"Content-Range": f"bytes */{size}"})
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        # suffixe: les N derniers octets
+        start, end = max(0, size - int(m.group(2))), size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range hors du fichier",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _content_disposition(filename: str) -> str:
+    """attachment + nom ASCII de repli + nom UTF-8 (RFC 6266 / 5987)."""
+    fallback = "".join(
+        c if 32 <= ord(c) < 127 and c not in '"\\' else "_" for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+@router.get("/{dataset_id}/download", summary="Télécharger le CSV brut (streaming, Range)")
+def download_dataset(
+    dataset_id: str,
+    current_user: dict = Depends(get_current_user),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    compress: bool = Query(
+        False, description="Compresser à la volée (gzip); ignoré pour une requête Range"),
+):
     info = db.datasets_infos.find_one(
-        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"])}
+        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"]),
+         "archived_at": None},
+        projection={"hdfs_path": 1, "filename": 1, "status": 1},
     )
     if not info:
         raise HTTPException(status_code=404, detail="Dataset introuvable")
+    if not info.get("hdfs_path"):
+        raise HTTPException(
+            status_code=409, detail="Le fichier n'est pas encore disponible")
+
+    client = get_hdfs_client()
+    hdfs_path = info["hdfs_path"]
+    # raw.csv absent (upload en échec, purge en cours...): None au lieu d'HdfsError
+    file_status = client.status(hdfs_path, strict=False)
+    if file_status is None:
+        if info.get("status") != "done":
+            raise HTTPException(
+                status_code=409, detail="Le fichier n'est pas encore disponible")
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    size = int(file_status["length"])
+    byte_range = _parse_range(range_header, size)
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    length = max(0, end - start + 1)
+    gzip = compress and byte_range is None
+
+    # En-têtes construits avant de réserver le slot (aucune erreur possible ensuite)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": _content_disposition(info.get("filename") or "raw.csv"),
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    else:
+        headers["Content-Length"] = str(length)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    # Limite de téléchargements simultanés par utilisateur (tous process API confondus)
+    slot_name = f"download:{current_user['_id']}"
+    token = acquire_slot(slot_name, settings.max_concurrent_downloads_per_user,
+                         settings.download_slot_ttl_seconds)
+    if token is None:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Trop de téléchargements en cours (max {settings.max_concurrent_downloads_per_user})",
+        )
 
-    try:
-        user_id = str(current_user["_id"])
-        dir_path = f"{settings.hdfs_base_dir}/{user_id}/{dataset_id}"
-        hdfs_admin = get_hdfs_client_as(settings.hdfs_admin_user)
+    def _stream():
+        # mémoire constante: on relaie les chunks WebHDFS un par un
         try:
-            hdfs_admin.delete(dir_path, recursive=True)
-        except Exception:
-            pass
-        hdfs_error = None
-    except Exception as e:
-        hdfs_error = str(e)
-
-    db.datasets_initial_analyze.delete_one({
-        "dataset_id": ObjectId(dataset_id),
-        "user_id": ObjectId(current_user["_id"]),
-    })
-    db.datasets_infos.delete_one({"_id": ObjectId(dataset_id)})
+            if length == 0:
+                return
+            encoder = zlib.compressobj(wbits=31) if gzip else None  # 31 = format gzip
+            with client.read(hdfs_path, offset=start, length=length,
+                             chunk_size=settings.download_chunk_size) as reader:
+                for chunk in reader:
+                    if encoder:
+                        chunk = encoder.compress(chunk)
+                        if not chunk:
+                            continue
+                    yield chunk
+            if encoder:
+                yield encoder.flush()
+        finally:
+            release_slot(slot_name, token)
+
+    stream = _stream()
+    # Le finally du générateur ne s'exécute pas s'il n'a jamais démarré (client
+    # déconnecté avant le premier chunk): on libère aussi le slot à sa collecte.
+    weakref.finalize(stream, release_slot, slot_name, token)
+
+    return StreamingResponse(
+        stream,
+        status_code=206 if byte_range else 200,
+        media_type="text/csv",
+        headers=headers,
+    )
+
+
+def _query_page(dataset_id: str, qhash: str, result: dict, page: int, page_size: int) -> dict:
+    rows = result["rows"]
+    start = (page - 1) * page_size
+    return {
+        "dataset_id": dataset_id,
+        "query_id": qhash,
+        "status": "done",
+        "columns": result["columns"],
+        "rows": rows[start:start + page_size],
+        "page": page,
+        "page_size": page_size,
+        "total_rows": len(rows),
+        "truncated": result.get("truncated", False),
+    }
+
+
+def _query_pending(dataset_id: str, qhash: str) -> JSONResponse:
+    return JSONResponse(
+        {"dataset_id": dataset_id, "query_id": qhash, "status": "running"},
+        status_code=202,
+    )
+
+
+@router.post("/{dataset_id}/query", summary="Requête ad-hoc (filtres, group-by, agrégats)")
+def query_dataset(
+    dataset_id: str,
+    body: DatasetQuery,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Résultat servi depuis le cache si la même requête a déjà été calculée (200),
+    sinon calcul lancé en tâche de fond (202 + query_id à interroger).
+    """
+    dataset_oid = ObjectId(dataset_id)
+    info = db.datasets_infos.find_one(
+        {"_id": dataset_oid, "user_id": ObjectId(current_user["_id"]),
+         "archived_at": None},
+        projection={"status": 1},
+    )
+    if not info:
+        raise HTTPException(status_code=404, detail="Dataset introuvable")
+    if info.get("status") != "done":
+        raise HTTPException(
+            status_code=409, detail="Le dataset n'est pas encore analysé")
+
+    analysis = load_analysis(
+        db, dataset_oid, ObjectId(current_user["_id"]), fields=["schema"])
+    columns = [f["name"] for f in (analysis or {}).get("schema", [])]
+    try:
+        validate_query(body, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page_size = min(page_size, settings.query_max_page_size)
+    qhash = query_hash(body)
+    result = get_query_result(dataset_id, qhash)
+    if result is not None:
+        return _query_page(dataset_id, qhash, result, page, page_size)
+
+    state = get_query_state(dataset_id, qhash)
+    failed = bool(state and state.get("state") == "failed")
+    # Une seule exécution par requête identique, même en cas de soumissions concurrentes
+    if claim_query(dataset_id, qhash, force=failed):
+        celery_app.send_task(
+            "datasets.query",
+            kwargs={
+                "dataset_id": dataset_id,
+                "user_id": str(current_user["_id"]),
+                "query": body.model_dump(),
+                "query_hash": qhash,
+            },
+        )
+    return _query_pending(dataset_id, qhash)
+
+
+@router.get("/{dataset_id}/query/{query_id}", summary="Résultat paginé d'une requête ad-hoc")
+def get_query(
+    dataset_id: str,
+    query_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1),
+    current_user: dict = Depends(get_current_user),
+):
+    info = db.datasets_infos.find_one(
+        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"]),
+         "archived_at": None},
+        projection={"_id": 1},
+    )
+    if not info:
+        raise HTTPException(status_code=404, detail="Dataset introuvable")
+
+    page_size = min(page_size, settings.query_max_page_size)
+    result = get_query_result(dataset_id, query_id)
+    if result is not None:
+        return _query_page(dataset_id, query_id, result, page, page_size)
+
+    state = get_query_state(dataset_id, query_id)
+    if not state:
+        raise HTTPException(
+            status_code=404, detail="Requête inconnue ou expirée")
+    if state.get("state") == "failed":
+        raise HTTPException(
+            status_code=422, detail=f"La requête a échoué: {state.get('error')}")
+    return _query_pending(dataset_id, query_id)
+
+
+@router.post("/{dataset_id}/cancel", summary="Annuler le traitement en cours")
+def cancel_dataset(dataset_id: str, current_user: dict = Depends(get_current_user)):
+    base_filter = {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"]),
+                   "archived_at": None}
+    info = db.datasets_infos.find_one(
+        base_filter, projection={"status": 1, "task_id": 1})
+    if not info:
+        raise HTTPException(status_code=404, detail="Dataset introuvable")
+
+    now = datetime.utcnow()
+    # En file: on passe directement en cancelled (la tâche ne démarrera pas)
+    queued = db.datasets_infos.find_one_and_update(
+        {**base_filter, "status": "queued"},
+        {"$set": {"status": "cancelled", "cancel_requested": True, "updated_at": now}},
+    )
+    if queued:
+        if queued.get("task_id"):
+            celery_app.control.revoke(queued["task_id"])
+        # La tâche révoquée ne passera pas par son nettoyage: on libère le fichier ici
+        if queued.get("local_path"):
+            try:
+                os.remove(queued["local_path"])
+            except OSError:
+                pass
+        invalidate_details(str(current_user["_id"]), [dataset_id])
+        return {"dataset_id": dataset_id, "status": "cancelled"}
+
+    # En cours: signal coopératif, le worker interrompt HDFS/Spark et nettoie
+    running = db.datasets_infos.update_one(
+        {**base_filter, "status": {"$in": RUNNING_STATUSES}},
+        {"$set": {"cancel_requested": True, "updated_at": now}},
+    )
+    if running.matched_count:
+        return {"dataset_id": dataset_id, "status": "cancelling"}
+
+    raise HTTPException(
+        status_code=409, detail="Le traitement de ce dataset est déjà terminé")
+
+
+def _queue_purge(user_id: str, dataset_ids: List[str]) -> None:
+    """Suppression HDFS + Mongo différée (tâche Celery avec retries)."""
+    celery_app.send_task(
+        "datasets.purge",
+        kwargs={"user_id": user_id, "dataset_ids": dataset_ids},
+    )
+
+
+@router.post("/archive", summary="Archiver plusieurs datasets")
+def bulk_archive_datasets(body: BulkArchiveRequest, current_user: dict = Depends(get_current_user)):
+    if len(body.dataset_ids) > settings.bulk_archive_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {settings.bulk_archive_max_items} datasets par requête",
+        )
+
+    user_oid = ObjectId(current_user["_id"])
+    oids = [ObjectId(i) for i in set(body.dataset_ids) if ObjectId.is_valid(i)]
+
+    # Soft-delete en une requête; le jeton identifie les docs réellement archivés ici
+    token = uuid.uuid4().hex
+    db.datasets_infos.update_many(
+        {"_id": {"$in": oids}, "user_id": user_oid, "archived_at": None},
+        # cancel_requested: une tâche encore en file/en cours s'arrête et nettoie HDFS
+        {"$set": {"archived_at": datetime.utcnow(), "archive_token": token,
+                  "cancel_requested": True}},
+    )
+    archived = [
+        str(d["_id"])
+        for d in db.datasets_infos.find({"archive_token": token}, projection={"_id": 1})
+    ]
+    if archived:
+        release_archived(db, user_oid, {"archive_token": token})
+        invalidate_details(str(user_oid), archived)
+        invalidate_queries(archived)
+        _queue_purge(str(user_oid), archived)
+
+    not_found = sorted(set(body.dataset_ids) - set(archived))
+    return {"archived": archived, "not_found": not_found}
+
+
+@router.delete("/{dataset_id}", summary="Archiver (masque puis purge DB + HDFS en tâche de fond)")
+def archive_dataset(dataset_id: str, current_user: dict = Depends(get_current_user)):
+    info = db.datasets_infos.find_one_and_update(
+        {"_id": ObjectId(dataset_id), "user_id": ObjectId(current_user["_id"]),
+         "archived_at": None},
+        {"$set": {"archived_at": datetime.utcnow(), "cancel_requested": True}},
+        projection={"_id": 1},
+    )
+    if not info:
+        raise HTTPException(status_code=404, detail="Dataset introuvable")
+
+    release_archived(db, ObjectId(current_user["_id"]), {"_id": info["_id"]})
+    invalidate_details(str(current_user["_id"]), [dataset_id])
+    invalidate_queries([dataset_id])
+    _queue_purge(str(current_user["_id"]), [dataset_id])
 
-    return {"dataset_id": dataset_id, "archived": True, "hdfs_error": hdfs_error}
+    return {"dataset_id": dataset_id, "archived": True}
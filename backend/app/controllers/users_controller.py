@@ -1,15 +1,21 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends  # type: ignore
+from fastapi import APIRouter, HTTPException, Depends, Query  # type: ignore
+from fastapi.concurrency import run_in_threadpool  # type: ignore
 from pydantic import BaseModel, EmailStr  # type: ignore
 from bson import ObjectId  # type: ignore
 from .. import db
 from ..enums.role_enum import Role
-from ..services.encrypt import hash_password
+from ..services.encrypt import HashingBusy, hash_password_async
 from .auth_controller import get_current_user  # dépendance auth
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Champs lus pour construire UserOut (jamais le hash du mot de passe)
+USER_PROJECTION = {"username": 1, "email": 1, "role": 1,
+                   "created_at": 1, "updated_at": 1}
+MAX_PAGE_SIZE = 200
+
 
 class UserBase(BaseModel):
     username: str
@@ -33,6 +39,25 @@ class UserOut(UserBase):
     updated_at: datetime
 
 
+class UserStatsOut(BaseModel):
+    user_id: str
+    username: Optional[str] = None
+    email: Optional[str] = None
+    dataset_count: int = 0
+    total_rows: int = 0
+    total_bytes: int = 0
+    failed_count: int = 0
+    updated_at: Optional[datetime] = None
+
+
+async def _hash_or_503(password: str) -> str:
+    try:
+        return await hash_password_async(password)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Password hashing busy, retry later",
+                            headers={"Retry-After": "1"})
+
+
 def _user_helper(user: dict) -> UserOut:
     return UserOut(
         id=str(user["_id"]),
@@ -45,28 +70,74 @@ def _user_helper(user: dict) -> UserOut:
 
 
 @router.post("/", response_model=UserOut)
-def create_user(user: UserCreate):
+async def create_user(user: UserCreate):
     """Inscription (publique)"""
-    if db.users.find_one({"email": user.email}):
+    # async comme le login: bcrypt dans son pool, Mongo dans le threadpool
+    if await run_in_threadpool(db.users.find_one, {"email": user.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    user_dict = user.dict()
+    user_dict["password"] = await _hash_or_503(user_dict["password"])
+    return await run_in_threadpool(_insert_user, user_dict)
+
+
+def _insert_user(user_dict: dict) -> UserOut:
     now = datetime.utcnow()
     role = Role.ADMIN.value if db.users.count_documents(
         {}) == 0 else Role.USER.value
-    user_dict = user.dict()
-    user_dict["password"] = hash_password(user_dict["password"])
     user_dict.update({"role": role, "created_at": now, "updated_at": now})
     result = db.users.insert_one(user_dict)
     created_user = db.users.find_one({"_id": result.inserted_id})
     return _user_helper(created_user)
 
 
-@router.get("/", response_model=List[UserOut])
-def list_users(current_user: dict = Depends(get_current_user)):
-    """Lister tous les utilisateurs (admin seulement)"""
+def _require_admin(current_user: dict) -> None:
     if current_user["role"] != Role.ADMIN.value:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return [_user_helper(u) for u in db.users.find()]
+
+
+@router.get("/", response_model=List[UserOut])
+def list_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user),
+):
+    """Lister les utilisateurs, paginé par _id (admin seulement)"""
+    _require_admin(current_user)
+    cursor = db.users.find({}, projection=USER_PROJECTION).sort(
+        "_id", 1).skip(skip).limit(limit)
+    return [_user_helper(u) for u in cursor]
+
+
+@router.get("/stats", response_model=List[UserStatsOut])
+def list_user_stats(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user),
+):
+    """Compteurs d'usage par utilisateur (admin seulement), cf. services/user_stats"""
+    _require_admin(current_user)
+    stats = list(db.user_stats.find().sort("_id", 1).skip(skip).limit(limit))
+    users = {
+        u["_id"]: u
+        for u in db.users.find(
+            {"_id": {"$in": [s["_id"] for s in stats]}},
+            projection={"username": 1, "email": 1},
+        )
+    }
+    return [
+        UserStatsOut(
+            user_id=str(s["_id"]),
+            username=users.get(s["_id"], {}).get("username"),
+            email=users.get(s["_id"], {}).get("email"),
+            dataset_count=s.get("dataset_count", 0),
+            total_rows=s.get("total_rows", 0),
+            total_bytes=s.get("total_bytes", 0),
+            failed_count=s.get("failed_count", 0),
+            updated_at=s.get("updated_at"),
+        )
+        for s in stats
+    ]
 
 
 @router.get("/{user_id}", response_model=UserOut)
@@ -83,17 +154,27 @@ def get_user(user_id: str, current_user: dict = Depends(get_current_user)):
 
 
 @router.put("/{user_id}", response_model=UserOut)
-def update_user(user_id: str, user_update: UserUpdate, current_user: dict = Depends(get_current_user)):
+async def update_user(user_id: str, user_update: UserUpdate, current_user: dict = Depends(get_current_user)):
     """Mettre à jour un utilisateur (soi-même ou admin)"""
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    update_data = {k: v for k, v in user_update.dict(
+        exclude_unset=True).items()}
+    await run_in_threadpool(_check_update, user_id, update_data, current_user)
+
+    if "password" in update_data:
+        update_data["password"] = await _hash_or_503(update_data["password"])
+
+    update_data["updated_at"] = datetime.utcnow()
+    return await run_in_threadpool(_apply_update, user_id, update_data)
+
+
+def _check_update(user_id: str, update_data: dict, current_user: dict) -> None:
+    user = db.users.find_one({"_id": ObjectId(user_id)}, {"_id": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     if str(user["_id"]) != str(current_user["_id"]) and current_user["role"] != Role.ADMIN.value:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    update_data = {k: v for k, v in user_update.dict(
-        exclude_unset=True).items()}
     if "email" in update_data:
         existing = db.users.find_one(
             {"email": update_data["email"], "_id": {"$ne": ObjectId(user_id)}})
@@ -101,10 +182,8 @@ def update_user(user_id: str, user_update: UserUpdate, current_user: dict = Depe
             raise HTTPException(
                 status_code=400, detail="Email already registered")
 
-    if "password" in update_data:
-        update_data["password"] = hash_password(update_data["password"])
 
-    update_data["updated_at"] = datetime.utcnow()
+def _apply_update(user_id: str, update_data: dict) -> UserOut:
     db.users.update_one({"_id": ObjectId(user_id)}, {"$set": update_data})
     updated_user = db.users.find_one({"_id": ObjectId(user_id)})
     return _user_helper(updated_user)
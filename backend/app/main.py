@@ -1,9 +1,14 @@
-from .services.hdfs_setup import ensure_hdfs_base_dir
-from fastapi import FastAPI  # type: ignore
+import threading
+from fastapi import Depends, FastAPI  # type: ignore
+from fastapi.responses import JSONResponse  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
+from .services.encrypt import bcrypt_rounds
 from .services.health import check_health
+from .services.queues import queue_stats
+from .services.readiness import readiness, set_state
+from .services.user_stats import backfill_user_stats
 from .controllers.users_controller import router as users_router
-from .controllers.auth_controller import router as auth_router
+from .controllers.auth_controller import require_admin, router as auth_router
 from .controllers.datasets_controller import router as datasets_router
 
 from .config import settings
@@ -29,17 +34,55 @@ app.add_middleware(
 # Index Mongo
 
 
-@app.on_event("startup")
-def ensure_indexes():
+def _ensure_indexes() -> None:
+    db.users.create_index("email", unique=True)
+    db.datasets_infos.create_index([("user_id", 1), ("created_at", -1)])
+    db.datasets_infos.create_index([("user_id", 1), ("status", 1)])
+    db.datasets_infos.create_index(
+        [("queue", 1), ("status", 1), ("queued_at", 1)])
+    db.datasets_infos.create_index("archive_token", sparse=True)
+    db.datasets_initial_analyze.create_index([("dataset_id", 1)], unique=True)
+    db.datasets_column_stats.create_index([("dataset_id", 1), ("start", 1)])
+
+
+def _init_backend() -> None:
+    try:
+        _ensure_indexes()
+        set_state("mongo_indexes", "ok")
+    except Exception as e:
+        set_state("mongo_indexes", f"error: {e}")
+
+    try:
+        # Datasets antérieurs aux compteurs par utilisateur (no-op une fois fait)
+        backfill_user_stats(db)
+    except Exception as e:
+        print(f"[WARN] user_stats backfill failed: {e}")
+
     try:
+        # import paresseux: le client hdfs n'est chargé qu'ici
+        from .services.hdfs_setup import ensure_hdfs_base_dir
         ensure_hdfs_base_dir()
+        set_state("hdfs_base_dir", "ok")
     except Exception as e:
         # on log seulement; en dev on préfère ne pas bloquer le démarrage de l'API
         print(f"[WARN] HDFS base dir init failed: {e}")
+        set_state("hdfs_base_dir", f"error: {e}")
+
+    # Calibration éventuelle du coût bcrypt hors requête (sinon payée par le premier login)
+    bcrypt_rounds()
 
-    db.users.create_index("email", unique=True)
-    db.datasets_infos.create_index([("user_id", 1), ("created_at", -1)])
-    db.datasets_initial_analyze.create_index([("dataset_id", 1)], unique=True)
+
+@app.on_event("startup")
+def start_background_init():
+    # Ne bloque pas le démarrage: un namenode lent ne retarde plus le service HTTP
+    threading.Thread(target=_init_backend, name="backend-init",
+                     daemon=True).start()
+
+
+@app.get("/ready", tags=["system"])
+def ready():
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
 
 
 @app.get("/health", tags=["system"])
@@ -47,6 +90,12 @@ def health():
     return check_health()
 
 
+@app.get("/queues", tags=["system"])
+def queues(current_user: dict = Depends(require_admin)):
+    """Profondeur et temps d'attente par file Celery (admin seulement)."""
+    return queue_stats()
+
+
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(datasets_router)
@@ -0,0 +1,157 @@
+"""
+Stockage compact des analyses (`datasets_initial_analyze`).
+
+Format v2: les stats par colonne sont des tableaux parallèles indexés par la
+position de la colonne dans `schema` (au lieu de dicts {colonne -> valeur}).
+Pour les datasets très larges, ces tableaux vont dans `datasets_column_stats`,
+découpés en chunks de colonnes. La lecture re-projette au format dict attendu
+par le front, en ne chargeant que les champs/colonnes demandés.
+"""
+from typing import Any, Dict, List, Sequence
+from bson import ObjectId  # type: ignore
+from ..config import settings
+
+ANALYSIS_SCHEMA_VERSION = 2
+
+# Stats par colonne stockées en tableaux parallèles
+PER_COLUMN_FIELDS = ("null_counts", "distinct_counts", "bad_type_counts")
+
+# Stats où seules les valeurs > 0 sont exposées (compat format v1)
+SPARSE_FIELDS = {"bad_type_counts"}
+
+
+def _column_arrays(analysis: Dict[str, Any], columns: List[str]) -> Dict[str, List[int]]:
+    return {
+        field: [int((analysis.get(field) or {}).get(c, 0)) for c in columns]
+        for field in PER_COLUMN_FIELDS
+    }
+
+
+def save_analysis(database, base_doc: Dict[str, Any], analysis: Dict[str, Any]) -> None:
+    """
+    Enregistre l'analyse au format compact (idempotent: remplace l'existant).
+    `base_doc` contient dataset_id, user_id, generated_at, hdfs_path.
+    """
+    dataset_oid = base_doc["dataset_id"]
+    columns = [f["name"] for f in analysis.get("schema", [])]
+    arrays = _column_arrays(analysis, columns)
+
+    doc: Dict[str, Any] = {
+        **base_doc,
+        **{k: v for k, v in analysis.items() if k not in PER_COLUMN_FIELDS},
+        "schema_version": ANALYSIS_SCHEMA_VERSION,
+    }
+
+    database.datasets_column_stats.delete_many({"dataset_id": dataset_oid})
+    if len(columns) > settings.analysis_inline_max_columns:
+        size = settings.analysis_stats_chunk_size
+        chunks = [
+            {
+                "dataset_id": dataset_oid,
+                "user_id": base_doc["user_id"],
+                "start": start,
+                **{field: values[start:start + size] for field, values in arrays.items()},
+            }
+            for start in range(0, len(columns), size)
+        ]
+        database.datasets_column_stats.insert_many(chunks)
+        doc["stats_storage"] = "side"
+    else:
+        doc["stats"] = arrays
+        doc["stats_storage"] = "inline"
+
+    database.datasets_initial_analyze.replace_one(
+        {"dataset_id": dataset_oid}, doc, upsert=True)
+
+
+def _projection(fields: Sequence[str] | None) -> Dict[str, int] | None:
+    if not fields:
+        return None
+    proj = {"schema": 1, "schema_version": 1, "stats_storage": 1}
+    for f in fields:
+        proj[f"stats.{f}" if f in PER_COLUMN_FIELDS else f] = 1
+        if f in PER_COLUMN_FIELDS:
+            # format v1: dict à la racine
+            proj[f] = 1
+    return proj
+
+
+def _side_arrays(database, dataset_oid: ObjectId, wanted: Sequence[str],
+                 positions: List[int]) -> Dict[str, Dict[int, int]]:
+    """Charge uniquement les chunks annexes qui couvrent les positions demandées."""
+    size = settings.analysis_stats_chunk_size
+    starts = sorted({(p // size) * size for p in positions})
+    out: Dict[str, Dict[int, int]] = {f: {} for f in wanted}
+    cursor = database.datasets_column_stats.find(
+        {"dataset_id": dataset_oid, "start": {"$in": starts}},
+        projection={"start": 1, **{f: 1 for f in wanted}},
+    )
+    for chunk in cursor:
+        for f in wanted:
+            for i, v in enumerate(chunk.get(f, [])):
+                out[f][chunk["start"] + i] = v
+    return out
+
+
+def load_analysis(database, dataset_oid: ObjectId, user_oid: ObjectId,
+                  fields: Sequence[str] | None = None,
+                  columns: Sequence[str] | None = None) -> Dict[str, Any] | None:
+    """
+    Relit une analyse et la renvoie au format "dict par colonne".
+      - fields: champs de l'analyse à renvoyer (None = tous)
+      - columns: colonnes à inclure dans schema et les stats (None = toutes)
+    """
+    doc = database.datasets_initial_analyze.find_one(
+        {"dataset_id": dataset_oid, "user_id": user_oid},
+        projection=_projection(fields),
+    )
+    if not doc:
+        return None
+
+    schema: List[Dict[str, Any]] = doc.get("schema") or []
+    names = [f["name"] for f in schema]
+    if columns:
+        wanted_cols = set(columns)
+        positions = [i for i, n in enumerate(names) if n in wanted_cols]
+    else:
+        positions = list(range(len(names)))
+    wanted = [f for f in PER_COLUMN_FIELDS if not fields or f in fields]
+
+    if doc.get("schema_version", 1) >= 2:
+        if doc.get("stats_storage") == "side":
+            by_pos = _side_arrays(database, dataset_oid, wanted, positions)
+            arrays = {f: [by_pos[f].get(p, 0) for p in positions]
+                      for f in wanted}
+        else:
+            stats = doc.pop("stats", {}) or {}
+            arrays = {f: [(stats.get(f) or [])[p] for p in positions]
+                      for f in wanted}
+        for f in wanted:
+            doc[f] = {
+                names[p]: int(v)
+                for p, v in zip(positions, arrays[f])
+                if f not in SPARSE_FIELDS or v > 0
+            }
+    elif columns:
+        # format v1 (dicts) : on filtre simplement
+        for f in wanted:
+            if isinstance(doc.get(f), dict):
+                doc[f] = {c: v for c, v in doc[f].items() if c in wanted_cols}
+
+    doc.pop("stats", None)
+    doc.pop("stats_storage", None)
+    if columns:
+        doc["schema"] = [schema[p] for p in positions]
+        if "constant_columns" in doc:
+            doc["constant_columns"] = [
+                c for c in doc["constant_columns"] if c in wanted_cols]
+        corr = doc.get("correlations")
+        if corr:
+            keep = [i for i, c in enumerate(corr["columns"]) if c in wanted_cols]
+            doc["correlations"] = {
+                "columns": [corr["columns"][i] for i in keep],
+                "matrix": [[corr["matrix"][i][j] for j in keep] for i in keep],
+            }
+    if fields and "schema" not in fields:
+        doc.pop("schema", None)
+    return doc
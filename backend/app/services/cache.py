@@ -0,0 +1,189 @@
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Tuple
+from bson import ObjectId  # type: ignore
+from redis import Redis  # type: ignore
+from ..config import settings
+
+# À incrémenter dès que le format du payload détail change
+DETAIL_CACHE_VERSION = 2
+
+# Une analyse terminée ne change plus: seuls ces statuts sont mis en cache
+CACHEABLE_STATUSES = {"done", "failed", "cancelled"}
+
+_redis: Redis | None = None
+
+
+def get_redis() -> Redis:
+    """Client Redis partagé par process (pool de connexions interne)."""
+    global _redis
+    if _redis is None:
+        _redis = Redis.from_url(settings.redis_url)
+    return _redis
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Type non sérialisable: {type(o).__name__}")
+
+
+def serialize_detail(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Sérialise le payload une fois pour toutes et calcule son ETag."""
+    body = json.dumps(payload, default=_json_default,
+                      separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, etag
+
+
+def _detail_key(user_id: str, dataset_id: str) -> str:
+    return f"dataset_detail:v{DETAIL_CACHE_VERSION}:{user_id}:{dataset_id}"
+
+
+def _generation_key(dataset_id: str) -> str:
+    return f"dataset_detail_gen:{dataset_id}"
+
+
+def detail_generation(dataset_id: str) -> int | None:
+    """
+    Génération du détail d'un dataset, incrémentée à chaque invalidation.
+    À lire *avant* de charger le détail dans Mongo puis à passer à
+    set_cached_detail: une entrée calculée avant une invalidation concurrente
+    (archivage, purge) porte l'ancienne génération et n'est jamais servie.
+    None si Redis est indisponible (pas de cache).
+    """
+    try:
+        return int(get_redis().get(_generation_key(dataset_id)) or 0)
+    except Exception:
+        return None
+
+
+def get_cached_detail(user_id: str, dataset_id: str) -> Tuple[Tuple[bytes, str] | None, int | None]:
+    """
+    Renvoie ((body, etag) ou None, génération courante) en un aller-retour Redis.
+    Une entrée d'une génération antérieure est ignorée.
+    """
+    try:
+        pipe = get_redis().pipeline()
+        pipe.get(_generation_key(dataset_id))
+        pipe.hmget(_detail_key(user_id, dataset_id), "body", "etag", "gen")
+        raw_gen, (body, etag, gen) = pipe.execute()
+    except Exception:
+        return None, None
+    generation = int(raw_gen or 0)
+    if body is None or etag is None or gen is None or int(gen) != generation:
+        return None, generation
+    return (body, etag.decode("utf-8")), generation
+
+
+def set_cached_detail(user_id: str, dataset_id: str, generation: int | None,
+                      body: bytes, etag: str) -> None:
+    if generation is None:
+        return
+    key = _detail_key(user_id, dataset_id)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(key, mapping={"body": body, "etag": etag, "gen": generation})
+        pipe.expire(key, settings.detail_cache_ttl_seconds)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def cache_dataset_detail(user_id: str, payload: Dict[str, Any], generation: int | None) -> None:
+    """Write-through: sérialise et stocke le détail s'il est dans un statut final."""
+    if payload.get("status") not in CACHEABLE_STATUSES:
+        return
+    body, etag = serialize_detail(payload)
+    set_cached_detail(user_id, payload["id"], generation, body, etag)
+
+
+def invalidate_details(user_id: str, dataset_ids: Iterable[str]) -> None:
+    """Supprime les entrées et incrémente la génération de chaque dataset."""
+    dataset_ids = list(dataset_ids)
+    if not dataset_ids:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        pipe.delete(*[_detail_key(user_id, i) for i in dataset_ids])
+        for dataset_id in dataset_ids:
+            pipe.incr(_generation_key(dataset_id))
+            # survit aux entrées qu'elle invalide (même TTL, relancé à chaque incr)
+            pipe.expire(_generation_key(dataset_id), settings.detail_cache_ttl_seconds)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+# -------------------------
+# Résultats de requêtes ad-hoc (clé = dataset + hash canonique de la requête)
+# -------------------------
+def _query_key(dataset_id: str, qhash: str) -> str:
+    return f"query_result:{dataset_id}:{qhash}"
+
+
+def _query_state_key(dataset_id: str, qhash: str) -> str:
+    return f"query_state:{dataset_id}:{qhash}"
+
+
+def _query_index_key(dataset_id: str) -> str:
+    return f"query_index:{dataset_id}"
+
+
+def get_query_result(dataset_id: str, qhash: str) -> Dict[str, Any] | None:
+    try:
+        raw = get_redis().get(_query_key(dataset_id, qhash))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+def set_query_result(dataset_id: str, qhash: str, result: Dict[str, Any]) -> None:
+    body = json.dumps(result, default=_json_default, separators=(",", ":"))
+    ttl = settings.query_cache_ttl_seconds
+    pipe = get_redis().pipeline()
+    pipe.set(_query_key(dataset_id, qhash), body, ex=ttl)
+    pipe.delete(_query_state_key(dataset_id, qhash))
+    pipe.sadd(_query_index_key(dataset_id), qhash)
+    pipe.expire(_query_index_key(dataset_id), ttl)
+    pipe.execute()
+
+
+def claim_query(dataset_id: str, qhash: str, force: bool = False, ttl_seconds: int = 600) -> bool:
+    """
+    Marque la requête "en cours"; False si un calcul identique est déjà lancé.
+    `force` écrase un état existant (ex: relance après échec).
+    """
+    return bool(get_redis().set(_query_state_key(dataset_id, qhash),
+                                json.dumps({"state": "running"}), nx=not force, ex=ttl_seconds))
+
+
+def get_query_state(dataset_id: str, qhash: str) -> Dict[str, Any] | None:
+    try:
+        raw = get_redis().get(_query_state_key(dataset_id, qhash))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+def set_query_failed(dataset_id: str, qhash: str, error: str) -> None:
+    # échec conservé peu de temps: une nouvelle soumission relancera le calcul
+    get_redis().set(_query_state_key(dataset_id, qhash),
+                    json.dumps({"state": "failed", "error": error}), ex=60)
+
+
+def invalidate_queries(dataset_ids: Iterable[str]) -> None:
+    try:
+        r = get_redis()
+        for dataset_id in dataset_ids:
+            hashes = [h.decode("utf-8") for h in r.smembers(_query_index_key(dataset_id))]
+            keys = [_query_key(dataset_id, h) for h in hashes]
+            r.delete(_query_index_key(dataset_id), *keys)
+    except Exception:
+        pass
@@ -0,0 +1,41 @@
+import time
+from typing import BinaryIO, Callable
+from bson import ObjectId  # type: ignore
+
+
+class DatasetCancelled(Exception):
+    """Le traitement du dataset a été annulé par l'utilisateur."""
+
+
+def is_cancel_requested(database, dataset_oid: ObjectId) -> bool:
+    info = database.datasets_infos.find_one(
+        {"_id": dataset_oid}, projection={"cancel_requested": 1})
+    return bool(info and info.get("cancel_requested"))
+
+
+class CancellableReader:
+    """
+    Enveloppe un fichier lu par le client WebHDFS: vérifie périodiquement
+    l'annulation et interrompt l'upload en cours (DatasetCancelled).
+    """
+
+    def __init__(self, raw: BinaryIO, should_cancel: Callable[[], bool], interval: float = 1.0):
+        self._raw = raw
+        self._should_cancel = should_cancel
+        self._interval = interval
+        self._last_check = time.monotonic()
+
+    def read(self, size: int = -1) -> bytes:
+        now = time.monotonic()
+        if now - self._last_check >= self._interval:
+            self._last_check = now
+            if self._should_cancel():
+                raise DatasetCancelled("Upload HDFS annulé")
+        return self._raw.read(size)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
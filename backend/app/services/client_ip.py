@@ -0,0 +1,40 @@
+"""
+IP du client derrière un ou plusieurs reverse proxys de confiance.
+
+On ne lit X-Forwarded-For que si le pair TCP est un proxy de confiance
+(TRUSTED_PROXIES_CSV), puis on remonte la chaîne depuis la droite: la première
+adresse qui n'est pas un proxy de confiance est celle du client (les entrées plus
+à gauche peuvent être forgées par le client lui-même).
+"""
+import ipaddress
+from functools import lru_cache
+from typing import List
+
+from fastapi import Request  # type: ignore
+
+from ..config import settings
+
+
+@lru_cache(maxsize=1)
+def _trusted_networks() -> List[ipaddress._BaseNetwork]:
+    return [ipaddress.ip_network(p, strict=False) for p in settings.trusted_proxies]
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in net for net in _trusted_networks())
+
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+    forwarded = request.headers.get("x-forwarded-for", "")
+    chain = [a.strip() for a in forwarded.split(",") if a.strip()]
+    for address in reversed(chain):
+        if not _is_trusted(address):
+            return address
+    return chain[0] if chain else peer
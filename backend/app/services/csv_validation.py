@@ -0,0 +1,236 @@
+"""
+Validation structurelle rapide d'un CSV, avant tout envoi vers HDFS/Spark.
+
+Le fichier est parcouru par blocs d'octets découpés en lignes; les champs d'une
+ligne sans guillemet sont comptés avec `bytes.count` (boucle Python par ligne,
+sans décodage ni lecteur csv). Seuls les enregistrements contenant un guillemet
+(une ligne, ou plusieurs si un champ quoté contient un retour à la ligne) sont
+relus avec le lecteur `csv` (C, strict): un en-tête quoté ne fait pas perdre le
+chemin rapide au reste du fichier.
+
+Encodage: UTF-8 d'abord, sinon cp1252 (exports Excel Windows), sinon Latin-1
+(qui décode tout octet). Séparateurs, guillemets et fins de ligne étant ASCII,
+le comptage en octets est identique quel que soit l'encodage retenu.
+"""
+import codecs
+import csv
+import io
+import re
+from typing import Any, Dict, List
+
+CHUNK_SIZE = 1024 * 1024
+CANDIDATE_DELIMITERS = (",", ";", "\t", "|")
+MAX_ERRORS = 20
+# Encodages essayés après UTF-8 (noms compris par Python et par Spark/Java)
+FALLBACK_ENCODINGS = ("cp1252", "iso-8859-1")
+
+_QUOTED = re.compile(rb'"[^"]*"')
+
+
+def _detect_delimiter(header: bytes) -> str:
+    # on ignore les délimiteurs à l'intérieur des champs quotés
+    bare = _QUOTED.sub(b"", header)
+    counts = {d: bare.count(d.encode()) for d in CANDIDATE_DELIMITERS}
+    best = max(counts, key=lambda d: counts[d])
+    return best if counts[best] > 0 else ","
+
+
+def _fallback_encoding(f) -> str:
+    """Premier encodage de repli qui décode tout le fichier (lecture par blocs)."""
+    for encoding in FALLBACK_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        f.seek(0)
+        try:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return FALLBACK_ENCODINGS[-1]
+
+
+def _error(errors: List[Dict[str, Any]], line: int, message: str, **extra: Any) -> None:
+    if len(errors) < MAX_ERRORS:
+        errors.append({"line": line, "message": message, **extra})
+
+
+class _FieldCounter:
+    """
+    Vérifie le nombre de champs ligne par ligne. Les lignes contenant un guillemet
+    forment des segments relus par le lecteur csv; un segment se prolonge tant que
+    le nombre de guillemets est impair (retour à la ligne dans un champ quoté), au
+    besoin sur le bloc suivant. Un bloc densément quoté est relu d'un seul tenant.
+    """
+
+    def __init__(self, delimiter: str, expected: int, errors: List[Dict[str, Any]]):
+        self.delimiter = delimiter
+        self.sep = delimiter.encode()
+        self.expected = expected
+        self.errors = errors
+        self.pending: List[bytes] = []   # segment quoté dont un guillemet reste ouvert
+        self.pending_line = 0            # n° de sa première ligne
+        self.pending_quotes = 0
+
+    def _check_count(self, line_no: int, found: int) -> None:
+        if line_no > 1 and found != self.expected:
+            _error(self.errors, line_no, "Nombre de champs incorrect",
+                   expected=self.expected, found=found)
+
+    def _check_quoted(self, lines: List[bytes], first_line_no: int) -> None:
+        record = b"\n".join(lines)
+        if first_line_no == 1 and record.startswith(codecs.BOM_UTF8):
+            record = record[len(codecs.BOM_UTF8):]
+        # séparateurs/guillemets/fins de ligne ASCII: Latin-1 suffit pour la
+        # structure, quel que soit l'encodage réel du fichier
+        reader = csv.reader(io.StringIO(record.decode("iso-8859-1"), newline=""),
+                            delimiter=self.delimiter, strict=True)
+        expected = self.expected
+        consumed = 0
+        while True:
+            try:
+                for row in reader:
+                    if len(row) != expected and row and not (len(row) == 1 and not row[0].strip()):
+                        self._check_count(first_line_no + consumed, len(row))
+                    consumed = reader.line_num
+                return
+            except csv.Error as e:
+                # le lecteur reprend à la ligne suivante
+                _error(self.errors, first_line_no + reader.line_num - 1,
+                       f"Guillemets mal formés: {e}")
+                consumed = reader.line_num
+
+    def _check_unquoted(self, lines: List[bytes], first_line_no: int) -> None:
+        for i, n in enumerate([ln.count(self.sep) for ln in lines]):
+            if n + 1 != self.expected and lines[i].strip(b"\r"):
+                self._check_count(first_line_no + i, n + 1)
+
+    def feed(self, lines: List[bytes], first_line_no: int, quote_count: int) -> None:
+        """
+        `lines`: lignes physiques complètes (sans \\n) à partir de `first_line_no`;
+        `quote_count`: nombre de guillemets qu'elles contiennent (compté sur le bloc).
+        """
+        if not self.pending and not quote_count:
+            # chemin rapide: aucun guillemet dans tout le bloc
+            self._check_unquoted(lines, first_line_no)
+            return
+        if self.pending:
+            lines, first_line_no = self.pending + lines, self.pending_line
+            quote_count += self.pending_quotes
+            self.pending = []
+        if quote_count % 2 == 0 and quote_count >= len(lines):
+            # bloc densément quoté, refermé en fin de bloc: un seul passage du
+            # lecteur csv depuis la 1re ligne quotée (pas de découpage en Python)
+            i = next(k for k, ln in enumerate(lines) if b'"' in ln)
+            self._check_unquoted(lines[:i], first_line_no)
+            self._check_quoted(lines[i:], first_line_no + i)
+            return
+
+        # guillemets épars (ou champ ouvert en fin de bloc): seuls les segments
+        # quotés passent par le lecteur csv
+        quotes = [ln.count(b'"') for ln in lines]
+        i, n = 0, len(lines)
+        while i < n:
+            if not quotes[i]:
+                if lines[i].strip(b"\r"):
+                    self._check_count(first_line_no + i, lines[i].count(self.sep) + 1)
+                i += 1
+                continue
+            j, open_quotes = i, 0
+            while j < n and (open_quotes or quotes[j]):
+                open_quotes ^= quotes[j] & 1
+                j += 1
+            if open_quotes:
+                # guillemet encore ouvert en fin de bloc: suite au bloc suivant
+                self.pending, self.pending_line = lines[i:], first_line_no + i
+                self.pending_quotes = sum(quotes[i:])
+                if sum(len(ln) + 1 for ln in self.pending) > csv.field_size_limit():
+                    # jamais refermé: on signale et on reprend à la ligne suivante
+                    self.close()
+                return
+            self._check_quoted(lines[i:j], first_line_no + i)
+            i = j
+
+    def close(self) -> None:
+        if self.pending:
+            _error(self.errors, self.pending_line,
+                   "Guillemets mal formés: champ quoté non terminé")
+            self.pending = []
+
+
+def validate_csv(path: str) -> Dict[str, Any]:
+    """
+    Retourne un rapport:
+      - row_count: nombre de lignes physiques (en-tête compris)
+      - delimiter: séparateur détecté parmi , ; tabulation |
+      - encoding: "utf-8", "utf-8-sig", "cp1252" ou "iso-8859-1"
+      - column_count: nombre de champs de l'en-tête
+      - errors: [{line, message, ...}] (au plus MAX_ERRORS), vide si le fichier est valide
+    Les lignes vides sont ignorées (comme Spark).
+    """
+    errors: List[Dict[str, Any]] = []
+    report: Dict[str, Any] = {
+        "row_count": 0, "delimiter": ",", "encoding": "utf-8",
+        "column_count": 0, "errors": errors,
+    }
+
+    with open(path, "rb") as f:
+        head = f.read(CHUNK_SIZE)
+        if not head.strip():
+            _error(errors, 1, "Fichier vide")
+            return report
+        encoding = "utf-8-sig" if head.startswith(codecs.BOM_UTF8) else "utf-8"
+        report["encoding"] = encoding
+
+        header = head.split(b"\n", 1)[0].rstrip(b"\r")
+        if header.startswith(codecs.BOM_UTF8):
+            header = header[len(codecs.BOM_UTF8):]
+        delimiter = _detect_delimiter(header)
+        report["delimiter"] = delimiter
+        try:
+            expected = len(next(csv.reader(
+                [header.decode(encoding)], delimiter=delimiter)))
+        except (UnicodeDecodeError, csv.Error):
+            # (en-tête non UTF-8: l'encodage de repli est déterminé pendant le parcours)
+            expected = header.count(delimiter.encode()) + 1
+        report["column_count"] = expected
+
+        # --- Un seul parcours: encodage + nb de lignes + nb de champs
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        counter = _FieldCounter(delimiter, expected, errors)
+        newlines = 0          # lignes physiques complètes déjà vues
+        carry = b""           # début de ligne incomplète du bloc précédent
+        last_byte = b""
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            if decoder is not None:
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError:
+                    # pas de l'UTF-8: on cherche un encodage de repli puis on reprend
+                    pos = f.tell()
+                    encoding = report["encoding"] = _fallback_encoding(f)
+                    f.seek(pos)
+                    decoder = None
+            last_byte = chunk[-1:]
+
+            data = carry + chunk
+            lines = data.split(b"\n")
+            carry = lines.pop()
+            counter.feed(lines, newlines + 1,
+                         data.count(b'"', 0, len(data) - len(carry)))
+            newlines += len(lines)
+
+        if decoder is not None:
+            try:
+                # séquence multi-octets tronquée en fin de fichier
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                report["encoding"] = _fallback_encoding(f)
+
+        if carry:
+            counter.feed([carry], newlines + 1, carry.count(b'"'))
+        counter.close()
+        report["row_count"] = newlines + (1 if last_byte and last_byte != b"\n" else 0)
+
+    return report
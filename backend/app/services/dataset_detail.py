@@ -0,0 +1,50 @@
+from typing import Any, Dict, Sequence
+from bson import ObjectId  # type: ignore
+from .analysis_store import load_analysis
+
+
+def build_dataset_detail(info: Dict[str, Any], analysis: Dict[str, Any] | None) -> Dict[str, Any]:
+    """Payload de GET /datasets/{id} (info + analyse si dispo)."""
+    payload: Dict[str, Any] = {
+        "id": str(info["_id"]),
+        # affichage (custom_name ou filename)
+        "name": info.get("name"),
+        "custom_name": info.get("custom_name"),
+        "filename": info.get("filename"),
+        "status": info.get("status"),
+        "step": info.get("step"),
+        "row_count": info.get("row_count"),
+        "column_count": info.get("column_count"),
+        "hdfs_path": info.get("hdfs_path"),
+        "error_message": info.get("error_message"),
+        "created_at": info.get("created_at"),
+        "updated_at": info.get("updated_at"),
+    }
+
+    if analysis:
+        a = dict(analysis)
+        a["id"] = str(a.pop("_id"))
+        if isinstance(a.get("dataset_id"), ObjectId):
+            a["dataset_id"] = str(a["dataset_id"])
+        if isinstance(a.get("user_id"), ObjectId):
+            a["user_id"] = str(a["user_id"])
+        payload["analysis"] = a
+
+    return payload
+
+
+def load_dataset_detail(database, dataset_oid: ObjectId, user_oid: ObjectId,
+                        fields: Sequence[str] | None = None,
+                        columns: Sequence[str] | None = None) -> Dict[str, Any] | None:
+    """
+    Lit info + analyse dans Mongo; None si le dataset n'existe pas (ou est archivé).
+    `fields`/`columns` restreignent l'analyse renvoyée (cf. analysis_store.load_analysis).
+    """
+    info = database.datasets_infos.find_one(
+        {"_id": dataset_oid, "user_id": user_oid, "archived_at": None}
+    )
+    if not info:
+        return None
+    analysis = load_analysis(
+        database, dataset_oid, user_oid, fields=fields, columns=columns)
+    return build_dataset_detail(info, analysis)
@@ -1,12 +1,110 @@
+"""
+Hachage des mots de passe (bcrypt).
+
+Le travail CPU de bcrypt passe par un pool dédié et borné (BCRYPT_WORKERS threads,
+bcrypt relâche le GIL) pour ne pas saturer le threadpool par défaut de FastAPI
+(qui sert aussi les endpoints sync: polling de statut, etc.). Au-delà de
+BCRYPT_MAX_PENDING opérations en attente, on refuse vite (HashingBusy) au lieu
+d'empiler les requêtes.
+
+Le coût (rounds) vaut BCRYPT_ROUNDS (12 par défaut), identique sur toutes les
+instances. Avec BCRYPT_CALIBRATE, il est relevé au démarrage tant qu'un hachage
+tient dans BCRYPT_TARGET_MS; il ne descend jamais sous BCRYPT_ROUNDS ni sous
+MIN_ROUNDS. Les hashes d'un coût inférieur sont mis à niveau au login; un hash
+plus coûteux (autre instance, ancienne config) est conservé.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable
+
 import bcrypt  # type: ignore
 
+from ..config import settings
+
+# Bornes de la calibration (12 = défaut de bcrypt.gensalt(), plancher de sécurité)
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+CALIBRATION_ROUNDS = 8
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.bcrypt_workers or os.cpu_count() or 1,
+    thread_name_prefix="bcrypt",
+)
+_pending = threading.BoundedSemaphore(settings.bcrypt_max_pending)
+
+
+class HashingBusy(Exception):
+    """File d'attente du pool bcrypt pleine."""
+
+
+@lru_cache(maxsize=1)
+def bcrypt_rounds() -> int:
+    """Coût bcrypt: BCRYPT_ROUNDS, relevé par la calibration si BCRYPT_CALIBRATE."""
+    rounds = settings.bcrypt_rounds
+    if not settings.bcrypt_calibrate:
+        return rounds
+    salt = bcrypt.gensalt(rounds=CALIBRATION_ROUNDS)
+    samples = []
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        samples.append(time.perf_counter() - start)
+    # le temps double à chaque round supplémentaire
+    base_ms = min(samples) * 1000
+    calibrated = CALIBRATION_ROUNDS
+    while calibrated < MAX_ROUNDS and base_ms * 2 ** (calibrated + 1 - CALIBRATION_ROUNDS) <= settings.bcrypt_target_ms:
+        calibrated += 1
+    return max(rounds, MIN_ROUNDS, calibrated)
+
+
+def _submit(fn: Callable[..., Any], *args: Any) -> Future:
+    if not _pending.acquire(blocking=False):
+        raise HashingBusy("Trop d'opérations bcrypt en attente")
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+    return future
+
+
+def _hash(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=bcrypt_rounds())
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
 
 def hash_password(password: str) -> str:
     """Hash a plaintext password using bcrypt."""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+    return _submit(_hash, password).result()
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against the given hash."""
-    return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+    return _submit(_verify, password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password sans bloquer la boucle asyncio."""
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify_password sans bloquer la boucle asyncio."""
+    return await asyncio.wrap_future(_submit(_verify, password, hashed_password))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si le hash a été produit avec un coût inférieur au coût courant."""
+    try:
+        return int(hashed_password.split("$")[2]) < bcrypt_rounds()
+    except (IndexError, ValueError):
+        return False
@@ -1,16 +1,140 @@
-from hdfs import InsecureClient  # type: ignore
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Tuple
 from ..config import settings
 
+# Clients mutualisés par (pid, user): une session HTTP keep-alive par utilisateur HDFS.
+# Le pid évite de partager des sockets entre process après un fork (workers Celery).
+_clients: Dict[Tuple[int, str], Any] = {}
+_sessions: Dict[Tuple[int, str], Any] = {}
+_clients_lock = threading.Lock()
+
 
 def _base_url() -> str:
     return f"http://{settings.hadoop_host}:{settings.hadoop_port}"
 
 
+def _session():
+    import requests  # type: ignore
+    from requests.adapters import HTTPAdapter  # type: ignore
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2,
+                          pool_maxsize=settings.hdfs_pool_maxsize)
+    # namenode + datanodes (redirections WebHDFS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def get_hdfs_client():
     """Client WebHDFS avec l'utilisateur applicatif (par défaut 'hdfs')."""
-    return InsecureClient(_base_url(), user=settings.hdfs_user)
+    return get_hdfs_client_as(settings.hdfs_user)
 
 
 def get_hdfs_client_as(user: str):
     """Client WebHDFS en forçant un utilisateur (ex: 'root' pour l'init)."""
-    return InsecureClient(_base_url(), user=user)
+    key = (os.getpid(), user)
+    client = _clients.get(key)
+    if client is None:
+        from hdfs import InsecureClient  # type: ignore  # import paresseux
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                session = _session()
+                client = InsecureClient(
+                    _base_url(),
+                    user=user,
+                    session=session,
+                    timeout=settings.hdfs_timeout_seconds,
+                )
+                _sessions[key] = session
+                _clients[key] = client
+    return client
+
+
+class _FileSlice:
+    """Lecture bornée d'une portion [offset, offset+length) d'un fichier local."""
+
+    def __init__(self, path: str, offset: int, length: int):
+        self._f = open(path, "rb")
+        self._f.seek(offset)
+        self._remaining = length
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._f.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def _concat(user: str, target: str, sources: list[str]) -> None:
+    from hdfs.util import HdfsError  # type: ignore
+
+    get_hdfs_client_as(user)
+    # CONCAT n'est pas exposé par la lib hdfs: appel WebHDFS direct (même session)
+    res = _sessions[(os.getpid(), user)].post(
+        f"{_base_url()}/webhdfs/v1{target}",
+        params={"op": "CONCAT", "sources": ",".join(sources), "user.name": user},
+        timeout=settings.hdfs_timeout_seconds,
+    )
+    if not res.ok:
+        raise HdfsError(f"CONCAT {target} a échoué: {res.status_code} {res.text}")
+
+
+def upload_file(hdfs_path: str, local_path: str,
+                wrap: Callable[[BinaryIO], Any] | None = None) -> None:
+    """
+    Écrit `local_path` sur HDFS (écrase l'existant), en streaming.
+    Au-delà de `hdfs_parallel_write_min_bytes`, le fichier est écrit en parties
+    (multiples de la taille de bloc) en parallèle, puis concaténé côté namenode.
+    `wrap` permet d'envelopper chaque flux lu (ex: annulation).
+    """
+    user = settings.hdfs_user
+    client = get_hdfs_client_as(user)
+    size = os.path.getsize(local_path)
+    wrap = wrap or (lambda raw: raw)
+
+    if size < settings.hdfs_parallel_write_min_bytes:
+        with open(local_path, "rb") as f:
+            client.write(hdfs_path, wrap(f), overwrite=True)
+        return
+
+    part_size = settings.hdfs_block_size * \
+        max(1, size // (settings.hdfs_block_size * settings.hdfs_parallel_write_workers))
+    offsets = list(range(0, size, part_size))
+    parts = [f"{hdfs_path}.part-{i:05d}" for i in range(len(offsets))]
+
+    def write_part(i: int) -> None:
+        part = _FileSlice(local_path, offsets[i], min(part_size, size - offsets[i]))
+        try:
+            client.write(parts[i], wrap(part), overwrite=True,
+                         blocksize=settings.hdfs_block_size)
+        finally:
+            part.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=settings.hdfs_parallel_write_workers) as pool:
+            list(pool.map(write_part, range(len(parts))))
+        if len(parts) > 1:
+            _concat(user, parts[0], parts[1:])
+        client.delete(hdfs_path)
+        client.rename(parts[0], hdfs_path)
+    except Exception:
+        for part in parts:
+            try:
+                client.delete(part)
+            except Exception:
+                pass
+        raise
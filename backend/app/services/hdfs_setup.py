@@ -1,7 +1,35 @@
-from hdfs.util import HdfsError  # type: ignore
-from .hdfs_client import get_hdfs_client_as
+import threading
+from typing import Set
+from .hdfs_client import get_hdfs_client, get_hdfs_client_as
 from ..config import settings
 
+# Dossiers déjà créés/normalisés par ce process: on ne refait pas
+# makedirs/set_owner/set_permission à chaque dataset
+_known_dirs: Set[str] = set()
+_known_lock = threading.Lock()
+
+
+def _is_known(path: str) -> bool:
+    with _known_lock:
+        return path in _known_dirs
+
+
+def _mark_known(path: str) -> None:
+    with _known_lock:
+        _known_dirs.add(path)
+
+
+def _normalize(admin, path: str, permission: int) -> None:
+    # (ré)applique owner/perms
+    try:
+        admin.set_owner(path, owner=settings.hdfs_user, group="supergroup")
+    except Exception:
+        pass
+    try:
+        admin.set_permission(path, permission=permission)
+    except Exception:
+        pass
+
 
 def ensure_hdfs_base_dir(force: bool = False):
     """
@@ -11,7 +39,11 @@ def ensure_hdfs_base_dir(force: bool = False):
       - perms=777
     Idempotent.
     """
+    from hdfs.util import HdfsError  # type: ignore
+
     base = settings.hdfs_base_dir
+    if not force and _is_known(base):
+        return
     admin = get_hdfs_client_as(settings.hdfs_admin_user)
 
     try:
@@ -20,12 +52,34 @@ def ensure_hdfs_base_dir(force: bool = False):
         if "File exists" not in str(e) and not force:
             raise
 
-    # (ré)applique owner/perms
-    try:
-        admin.set_owner(base, owner=settings.hdfs_user, group="supergroup")
-    except Exception:
-        pass
+    _normalize(admin, base, 777)  # drwxrwxrwx
+    _mark_known(base)
+
+
+def ensure_dataset_dir(user_id: str, dataset_id: str) -> str:
+    """
+    Crée /user_datasets/<user_id>/<dataset_id> et renvoie son chemin.
+    Cas courant: un seul makedirs avec l'utilisateur applicatif. En cas de
+    "Permission denied", l'admin normalise la base (une fois par process) et
+    crée les dossiers en les rendant à l'utilisateur applicatif, pour que les
+    datasets suivants repassent par le cas courant.
+    """
+    from hdfs.util import HdfsError  # type: ignore
+
+    user_dir = f"{settings.hdfs_base_dir}/{user_id}"
+    dataset_dir = f"{user_dir}/{dataset_id}"
+
     try:
-        admin.set_permission(base, permission=777)  # drwxrwxrwx
-    except Exception:
-        pass
+        get_hdfs_client().makedirs(dataset_dir)
+        return dataset_dir
+    except HdfsError as e:
+        if "Permission denied" not in str(e):
+            raise
+
+    # Fallback: corrige les droits avec l'admin (root)
+    admin = get_hdfs_client_as(settings.hdfs_admin_user)
+    ensure_hdfs_base_dir()
+    admin.makedirs(dataset_dir, permission=775)  # drwxrwxr-x
+    _normalize(admin, user_dir, 775)
+    _normalize(admin, dataset_dir, 775)
+    return dataset_dir
@@ -0,0 +1,52 @@
+import time
+import uuid
+from .cache import get_redis
+
+
+def acquire_slot(name: str, limit: int, ttl_seconds: int) -> str | None:
+    """
+    Réserve un slot de concurrence partagé entre process API (sorted set Redis).
+    Renvoie un jeton à passer à `release_slot`, ou None si la limite est atteinte.
+    Les slots plus vieux que `ttl_seconds` (jamais libérés) sont purgés.
+    Si Redis est indisponible, on laisse passer (la limite est une protection, pas un contrôle d'accès).
+    """
+    key = f"slots:{name}"
+    token = uuid.uuid4().hex
+    now = time.time()
+    try:
+        r = get_redis()
+        pipe = r.pipeline()
+        pipe.zremrangebyscore(key, "-inf", now - ttl_seconds)
+        pipe.zadd(key, {token: now})
+        pipe.zcard(key)
+        pipe.expire(key, ttl_seconds)
+        _, _, count, _ = pipe.execute()
+        if count > limit:
+            r.zrem(key, token)
+            return None
+    except Exception:
+        pass
+    return token
+
+
+def release_slot(name: str, token: str) -> None:
+    try:
+        get_redis().zrem(f"slots:{name}", token)
+    except Exception:
+        pass
+
+
+def hit_rate_limit(name: str, limit: int, window_seconds: int) -> bool:
+    """
+    Compte un appel dans une fenêtre fixe de `window_seconds` (INCR Redis).
+    Renvoie False si la limite est dépassée. Si Redis est indisponible, on laisse passer.
+    """
+    key = f"rate:{name}:{int(time.time()) // window_seconds}"
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, window_seconds)
+        count, _ = pipe.execute()
+    except Exception:
+        return True
+    return count <= limit
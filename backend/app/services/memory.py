@@ -0,0 +1,88 @@
+from __future__ import annotations
+import os
+import resource
+import threading
+from typing import List
+
+
+def _children(pid: int) -> List[int]:
+    kids: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                kids.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return kids
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss_mb(pid: int | None = None) -> float:
+    """
+    RSS cumulée (Mo) du process et de ses descendants (ex: JVM Spark lancée par py4j).
+    Hors Linux (/proc absent): pic RSS du process courant via getrusage.
+    """
+    root = pid or os.getpid()
+    if not os.path.isdir("/proc"):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    total, stack, seen = 0, [root], set()
+    while stack:
+        p = stack.pop()
+        if p in seen:
+            continue
+        seen.add(p)
+        total += _rss_kb(p)
+        stack.extend(_children(p))
+    return total / 1024
+
+
+class PeakRssSampler:
+    """
+    Échantillonne en arrière-plan la RSS de l'arbre de process et garde le pic.
+    Usage:
+        with PeakRssSampler() as sampler:
+            ...
+        sampler.peak_mb
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        self.peak_mb = max(self.peak_mb, process_tree_rss_mb())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "PeakRssSampler":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> float:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+        return round(self.peak_mb, 1)
+
+    def __enter__(self) -> "PeakRssSampler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,110 @@
+"""
+DSL JSON (restreint) pour les requêtes ad-hoc sur un dataset.
+
+Exemple:
+    {
+      "select": ["ville"],
+      "where": [{"column": "age", "op": ">=", "value": 18}],
+      "group_by": ["ville"],
+      "aggregations": [{"fn": "avg", "column": "salaire", "alias": "salaire_moyen"}],
+      "order_by": [{"column": "salaire_moyen", "desc": true}],
+      "limit": 50
+    }
+"""
+import hashlib
+import json
+from typing import Any, List, Literal, Optional, Set
+from pydantic import BaseModel, Field  # type: ignore
+
+FilterOp = Literal["=", "!=", "<", "<=", ">", ">=",
+                   "in", "not_in", "is_null", "not_null", "contains"]
+AggFn = Literal["count", "sum", "avg", "min", "max", "count_distinct"]
+
+
+class QueryFilter(BaseModel):
+    column: str
+    op: FilterOp
+    value: Any = None
+
+
+class QueryAggregation(BaseModel):
+    fn: AggFn
+    # None uniquement pour count (= count(*))
+    column: Optional[str] = None
+    alias: Optional[str] = None
+
+    @property
+    def output_name(self) -> str:
+        return self.alias or f"{self.fn}_{self.column or 'all'}"
+
+
+class QueryOrder(BaseModel):
+    column: str
+    desc: bool = False
+
+
+class DatasetQuery(BaseModel):
+    select: List[str] = Field(default_factory=list)
+    where: List[QueryFilter] = Field(default_factory=list)
+    group_by: List[str] = Field(default_factory=list)
+    aggregations: List[QueryAggregation] = Field(default_factory=list)
+    order_by: List[QueryOrder] = Field(default_factory=list)
+    limit: Optional[int] = Field(default=None, ge=1)
+
+
+def validate_query(query: DatasetQuery, columns: List[str]) -> None:
+    """Vérifie la requête contre le schéma du dataset; lève ValueError si invalide."""
+    known: Set[str] = set(columns)
+
+    def check(col: str, where: str) -> None:
+        if col not in known:
+            raise ValueError(f"Colonne inconnue dans {where}: {col}")
+
+    for c in query.select:
+        check(c, "select")
+    for f in query.where:
+        check(f.column, "where")
+        if f.op in ("in", "not_in") and not isinstance(f.value, list):
+            raise ValueError(f"'{f.op}' attend une liste pour {f.column}")
+        if f.op not in ("is_null", "not_null") and f.value is None:
+            raise ValueError(f"Valeur manquante pour {f.column} {f.op}")
+    for c in query.group_by:
+        check(c, "group_by")
+    for a in query.aggregations:
+        if a.column is None:
+            if a.fn != "count":
+                raise ValueError(f"'{a.fn}' nécessite une colonne")
+        else:
+            check(a.column, "aggregations")
+
+    if query.group_by or query.aggregations:
+        extra = set(query.select) - set(query.group_by)
+        if extra:
+            raise ValueError(
+                "Avec une agrégation, select ne peut contenir que des colonnes de group_by: "
+                + ", ".join(sorted(extra)))
+        outputs = set(query.group_by) | {
+            a.output_name for a in query.aggregations}
+    else:
+        outputs = set(query.select) or known
+    for o in query.order_by:
+        if o.column not in outputs:
+            raise ValueError(f"order_by sur une colonne absente du résultat: {o.column}")
+
+
+def required_columns(query: DatasetQuery, columns: List[str]) -> List[str]:
+    """Colonnes à lire dans le CSV (élagage avant filtre/agrégation)."""
+    needed: Set[str] = set(query.select) | set(query.group_by)
+    needed |= {f.column for f in query.where}
+    needed |= {a.column for a in query.aggregations if a.column}
+    if not (query.select or query.group_by or query.aggregations):
+        return list(columns)
+    needed |= {o.column for o in query.order_by if o.column in columns}
+    return [c for c in columns if c in needed]
+
+
+def query_hash(query: DatasetQuery) -> str:
+    """Hash canonique (indépendant de l'ordre des clés JSON) servant de clé de cache."""
+    canonical = json.dumps(query.model_dump(), sort_keys=True,
+                           separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from redis import Redis  # type: ignore
+from ..config import settings
+from .. import db
+
+# Statuts considérés "en cours" pour le quota par utilisateur
+INFLIGHT_STATUSES = ["queued", "uploading_hdfs", "analyzing"]
+
+
+def dataset_queues() -> List[str]:
+    return [settings.dataset_queue_small, settings.dataset_queue_large]
+
+
+def pick_dataset_queue(size_bytes: int, rows: int) -> str:
+    """Choisit la file Celery selon la taille du fichier ou son nombre de lignes."""
+    if size_bytes >= settings.large_dataset_min_bytes or rows >= settings.large_dataset_min_rows:
+        return settings.dataset_queue_large
+    return settings.dataset_queue_small
+
+
+def count_inflight_datasets(user_id) -> int:
+    # Un dataset archivé ne compte plus, même si son worker a disparu en le
+    # laissant dans un statut "en cours" (sinon 429 à chaque upload)
+    return db.datasets_infos.count_documents(
+        {"user_id": user_id, "status": {"$in": INFLIGHT_STATUSES},
+         "archived_at": None}
+    )
+
+
+def queue_stats() -> Dict[str, Any]:
+    """
+    Profondeur et temps d'attente par file:
+      - depth: messages en attente côté broker (Redis LLEN)
+      - queued: datasets au statut "queued" côté Mongo
+      - oldest_wait_seconds: âge du plus ancien dataset encore en attente
+      - avg_wait_seconds: attente moyenne des 50 derniers datasets démarrés
+    """
+    now = datetime.utcnow()
+    r = Redis.from_url(settings.redis_url)
+    stats: Dict[str, Any] = {}
+    for queue in dataset_queues():
+        try:
+            depth: int | None = int(r.llen(queue))
+        except Exception:
+            depth = None
+
+        queued = db.datasets_infos.count_documents(
+            {"queue": queue, "status": "queued"})
+        oldest = db.datasets_infos.find_one(
+            {"queue": queue, "status": "queued"},
+            projection={"queued_at": 1},
+            sort=[("queued_at", 1)],
+        )
+        oldest_wait = None
+        if oldest and oldest.get("queued_at"):
+            oldest_wait = (now - oldest["queued_at"]).total_seconds()
+
+        recent = list(
+            db.datasets_infos.find(
+                {"queue": queue, "queue_wait_seconds": {"$ne": None}},
+                projection={"queue_wait_seconds": 1},
+            ).sort("started_at", -1).limit(50)
+        )
+        avg_wait = None
+        if recent:
+            avg_wait = sum(d["queue_wait_seconds"]
+                           for d in recent) / len(recent)
+
+        stats[queue] = {
+            "depth": depth,
+            "queued": queued,
+            "oldest_wait_seconds": oldest_wait,
+            "avg_wait_seconds": avg_wait,
+        }
+    return {"queues": stats}
@@ -0,0 +1,22 @@
+import threading
+from typing import Dict
+
+# État des initialisations lancées en tâche de fond au démarrage de l'API
+_lock = threading.Lock()
+_state: Dict[str, str] = {"mongo_indexes": "pending", "hdfs_base_dir": "pending"}
+
+# Composants sans lesquels l'API ne doit pas recevoir de trafic
+# (HDFS a un fallback côté worker: il est seulement reporté)
+REQUIRED = ("mongo_indexes",)
+
+
+def set_state(component: str, state: str) -> None:
+    with _lock:
+        _state[component] = state
+
+
+def readiness() -> Dict[str, object]:
+    with _lock:
+        components = dict(_state)
+    ready = all(components.get(c) == "ok" for c in REQUIRED)
+    return {"ready": ready, "components": components}
@@ -1,41 +1,198 @@
 # backend/app/services/spark_analyze.py
 from __future__ import annotations
-from typing import Any, Dict, List
-from pyspark.sql import SparkSession  # type: ignore
+import csv
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, List
+from pyspark.sql import Column, SparkSession  # type: ignore
 from pyspark.sql import functions as F  # type: ignore
-from pyspark.sql.types import StringType, StructField  # type: ignore
+from pyspark.sql.types import NumericType, StringType, StructField  # type: ignore
+from ...config import settings
+from ..cancellation import DatasetCancelled
 
+MB = 1024 * 1024
 
-def _spark() -> SparkSession:
+# Seuil |r| au-delà duquel deux colonnes sont signalées comme redondantes
+HIGH_CORRELATION = 0.95
+
+# Estimation grossière de l'empreinte mémoire d'une analyse (en Mo)
+JVM_BASE_MB = 512          # JVM + contexte Spark à vide
+PYTHON_OVERHEAD_MB = 256   # process worker Python (hors JVM)
+CACHE_EXPANSION = 6        # données en cache (lignes désérialisées) vs taille CSV
+STREAM_EXPANSION = 2       # sans cache: buffers de lecture/agrégation
+PER_COLUMN_MB = 1          # état d'agrégation par colonne (distinct exact, etc.)
+
+
+def estimate_footprint_mb(file_size: int, column_count: int, cache_dataframe: bool) -> int:
+    expansion = CACHE_EXPANSION if cache_dataframe else STREAM_EXPANSION
+    return int(JVM_BASE_MB + PYTHON_OVERHEAD_MB
+               + (file_size / MB) * expansion + column_count * PER_COLUMN_MB)
+
+
+def _col(name: str) -> Column:
+    """Colonne par son nom exact: les points (ex: "prix.ht") ne sont pas des accès struct."""
+    return F.col("`" + name.replace("`", "``") + "`")
+
+
+def _spark_charset(encoding: str) -> str:
+    # "utf-8-sig" n'est pas un charset Java: le BOM est lu comme de l'UTF-8
+    return "utf-8" if encoding == "utf-8-sig" else encoding
+
+
+def _header_column_count(local_path: str, sep: str = ",", encoding: str = "utf-8") -> int:
+    with open(local_path, newline="", encoding=encoding, errors="replace") as f:
+        return len(next(csv.reader(f, delimiter=sep), []))
+
+
+def worker_driver_memory() -> str:
+    """
+    Mémoire driver, fixe pour tout le process worker: spark.driver.memory n'est lu
+    qu'au lancement de la JVM (réutilisée d'une analyse à l'autre). On donne à la
+    JVM le budget du worker moins la part du process Python; l'adaptation par
+    fichier passe par la stratégie, le cache et les partitions.
+    """
+    return settings.spark_driver_memory or \
+        f"{max(512, settings.worker_memory_budget_mb - PYTHON_OVERHEAD_MB)}m"
+
+
+def choose_spark_profile(file_size: int, column_count: int) -> Dict[str, Any]:
+    """
+    Choisit la configuration Spark selon la taille du fichier et le nb de colonnes:
+      - small  (< 16 Mo): peu de partitions de shuffle (les 200 par défaut = tâches minuscules)
+      - medium (< 256 Mo): partitions proportionnelles aux cœurs
+      - large: partitions proportionnelles à la taille, pas de cache
+    Budget mémoire (WORKER_MEMORY_BUDGET_MB): si l'empreinte estimée le dépasse,
+    on renonce d'abord au cache, puis on passe en stratégie "approx" (distinct
+    approximatif en une passe, spill plus précoce, partitions d'entrée plus petites).
+    Les valeurs de `Settings` (SPARK_*, ANALYSIS_STRATEGY) surchargent le choix automatique.
+    """
+    cores = os.cpu_count() or 1
+    if file_size < 16 * MB:
+        tier, partitions = "small", cores
+    elif file_size < 256 * MB:
+        tier, partitions = "medium", 2 * cores
+    else:
+        tier = "large"
+        partitions = max(2 * cores, min(400, file_size // (64 * MB)))
+
+    # Les stats sont calculées en plusieurs passes: le cache évite de relire/parse
+    # le CSV à chaque passe, tant que les données tiennent en mémoire
+    cache_dataframe = tier != "large" and column_count <= 2000
+
+    budget = settings.worker_memory_budget_mb
+    strategy = "exact"
+    estimate = estimate_footprint_mb(file_size, column_count, cache_dataframe)
+    if estimate > budget and cache_dataframe:
+        cache_dataframe = False
+        estimate = estimate_footprint_mb(file_size, column_count, False)
+    if estimate > budget:
+        strategy = "approx"
+
+    profile: Dict[str, Any] = {
+        "tier": tier,
+        "file_size_bytes": int(file_size),
+        "column_count": int(column_count),
+        "shuffle_partitions": int(partitions),
+        "adaptive_enabled": True,
+        "driver_memory": worker_driver_memory(),
+        "cache_dataframe": cache_dataframe,
+        "memory_budget_mb": budget,
+        "estimated_footprint_mb": estimate,
+        "strategy": strategy,
+    }
+    overrides = {
+        "shuffle_partitions": settings.spark_shuffle_partitions,
+        "adaptive_enabled": settings.spark_adaptive_enabled,
+        "cache_dataframe": settings.spark_cache_dataframe,
+        "strategy": settings.analysis_strategy,
+    }
+    profile.update({k: v for k, v in overrides.items() if v is not None})
+    # fraction plus basse = exécution/stockage spillent plus tôt sur disque
+    exact = profile["strategy"] == "exact"
+    profile["memory_fraction"] = 0.6 if exact else 0.4
+    profile["max_partition_bytes"] = (128 if exact else 32) * MB
+    return profile
+
+
+def _spark(profile: Dict[str, Any]) -> SparkSession:
     # Spark local pour l’analyse initiale
+    # Les options s'appliquent à chaque session; la mémoire driver (fixe par process,
+    # cf. worker_driver_memory) au lancement de la JVM.
     return (
         SparkSession.builder
         .appName("initial_analyze")
         .master("local[*]")
+        .config("spark.driver.memory", profile["driver_memory"])
+        .config("spark.memory.fraction", str(profile["memory_fraction"]))
+        .config("spark.sql.files.maxPartitionBytes", str(profile["max_partition_bytes"]))
+        .config("spark.sql.shuffle.partitions", str(profile["shuffle_partitions"]))
+        .config("spark.sql.adaptive.enabled", str(profile["adaptive_enabled"]).lower())
+        .config("spark.sql.adaptive.coalescePartitions.enabled",
+                str(profile["adaptive_enabled"]).lower())
         .getOrCreate()
     )
 
 
-def analyze_csv_local(local_path: str) -> Dict[str, Any]:
+def _watch_cancellation(spark: SparkSession, group: str, should_cancel: Callable[[], bool],
+                        stop: threading.Event, cancelled: threading.Event) -> None:
+    # Thread de surveillance: annule le job group Spark dès que l'annulation est demandée
+    while not stop.wait(1.0):
+        try:
+            if should_cancel():
+                cancelled.set()
+                spark.sparkContext.cancelJobGroup(group)
+                return
+        except Exception:
+            pass
+
+
+def analyze_csv_local(local_path: str, profile: Dict[str, Any] | None = None,
+                      sep: str = ",", encoding: str = "utf-8",
+                      should_cancel: Callable[[], bool] | None = None) -> Dict[str, Any]:
     """
     Retourne un dict JSON-serializable:
       - row_count, column_count
       - schema: [{name, dtype}]
       - null_counts: {col -> int}
       - bad_type_counts: {col -> int} (lignes non vides qui ne se castent pas)
-      - distinct_counts: {col -> int}
+      - distinct_counts: {col -> int} (approximatif si spark_profile.strategy == "approx")
       - constant_columns: [col]
+      - correlations: {columns: [col], matrix: [[r]]} (Pearson, colonnes numériques
+        non constantes, plafonné à ANALYSIS_MAX_CORR_COLUMNS; r = None si indéfini)
+      - duplicate_row_count: int (lignes identiques à une ligne précédente)
       - suggestions: [str]
+      - spark_profile: configuration Spark utilisée (reproductibilité)
+    `sep` et `encoding` sont le séparateur et l'encodage détectés à l'upload (csv_validation).
+    Si `should_cancel` est fourni, les jobs Spark sont annulés dès qu'il renvoie True
+    (lève DatasetCancelled).
     """
-    spark = _spark()
+    if profile is None:
+        profile = choose_spark_profile(
+            os.path.getsize(local_path), _header_column_count(local_path, sep, encoding))
+    spark = _spark(profile)
+    stop, cancelled = threading.Event(), threading.Event()
+    if should_cancel is not None:
+        group = f"initial_analyze-{uuid.uuid4().hex}"
+        spark.sparkContext.setJobGroup(
+            group, "initial_analyze", interruptOnCancel=True)
+        threading.Thread(
+            target=_watch_cancellation,
+            args=(spark, group, should_cancel, stop, cancelled),
+            daemon=True,
+        ).start()
     try:
         # 1) Lecture typée (inferschema) pour connaître les types cibles
         df = (
             spark.read
             .option("header", True)
+            .option("sep", sep)
+            .option("encoding", _spark_charset(encoding))
             .option("inferSchema", True)
             .csv(local_path)
         )
+        if profile["cache_dataframe"]:
+            df = df.cache()
         row_count = df.count()
 
         # Schema propre: [{name, dtype}]
@@ -51,7 +208,7 @@ def analyze_csv_local(local_path: str) -> Dict[str, Any]:
         # - pour les autres: null
         null_counts: Dict[str, int] = {}
         for f in df.schema.fields:  # type: ignore[assignment]
-            col = F.col(f.name)
+            col = _col(f.name)
             if isinstance(f, StructField) and isinstance(f.dataType, StringType):
                 expr = F.when(
                     col.isNull() | (F.length(F.trim(col)) == 0) | (F.lower(col) == "nan"),
@@ -63,26 +220,37 @@ def analyze_csv_local(local_path: str) -> Dict[str, Any]:
                 df.select(F.sum(expr).alias("n")).collect()[0]["n"] or 0)
 
         # 3) Distinct + colonnes constantes
+        # - exact: un distinct() par colonne (shuffle, mémoire ~ cardinalité)
+        # - approx: HyperLogLog sur toutes les colonnes en une passe, mémoire constante
         distinct_counts: Dict[str, int] = {}
-        constant_columns: List[str] = []
-        for f in df.schema.fields:  # type: ignore[assignment]
-            n = df.select(f.name).distinct().count()
-            distinct_counts[f.name] = int(n)
-            if n <= 1:
-                constant_columns.append(f.name)
+        if profile["strategy"] == "approx":
+            row = df.agg(*[
+                F.approx_count_distinct(_col(f.name), rsd=0.05).alias(f"c{i}")
+                for i, f in enumerate(df.schema.fields)
+            ]).collect()[0]
+            for i, f in enumerate(df.schema.fields):
+                distinct_counts[f.name] = int(row[f"c{i}"] or 0)
+        else:
+            for f in df.schema.fields:  # type: ignore[assignment]
+                distinct_counts[f.name] = int(
+                    df.select(_col(f.name)).distinct().count())
+        constant_columns: List[str] = [
+            c for c, n in distinct_counts.items() if n <= 1]
 
         # 4) Valeurs mal typées
         # Relecture brute en "string" + tentative de cast vers le type inféré.
         raw = (
             spark.read
             .option("header", True)
+            .option("sep", sep)
+            .option("encoding", _spark_charset(encoding))
             .option("inferSchema", False)  # => tout en string
             .csv(local_path)
         )
         bad_type_counts: Dict[str, int] = {}
         for f in df.schema.fields:  # type: ignore[assignment]
             wanted = f.dataType
-            s = raw.select(F.col(f.name).alias("raw"))
+            s = raw.select(_col(f.name).alias("raw"))
             casted = s.select(
                 F.when(
                     F.col("raw").isNull() | (
@@ -99,7 +267,37 @@ def analyze_csv_local(local_path: str) -> Dict[str, Any]:
             if bad > 0:
                 bad_type_counts[f.name] = int(bad)
 
-        # 5) Suggestions simples
+        # 5) Corrélations (Pearson) entre colonnes numériques, en une seule passe:
+        # un agrégat corr() par paire dans le même df.agg
+        corr_columns = [
+            f.name for f in df.schema.fields  # type: ignore[assignment]
+            if isinstance(f.dataType, NumericType) and f.name not in constant_columns
+        ][:settings.analysis_max_corr_columns]
+        n = len(corr_columns)
+        matrix: List[List[float | None]] = [
+            [1.0 if i == j else None for j in range(n)] for i in range(n)]
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        if pairs:
+            row = df.agg(*[
+                F.corr(_col(corr_columns[i]), _col(corr_columns[j])).alias(f"r{i}_{j}")
+                for i, j in pairs
+            ]).collect()[0]
+            for i, j in pairs:
+                r = row[f"r{i}_{j}"]
+                # NaN (variance nulle sur les lignes communes) => None
+                r = round(float(r), 4) if r is not None and r == r else None
+                matrix[i][j] = matrix[j][i] = r
+
+        # 6) Lignes dupliquées: hash 64 bits de chaque ligne puis distinct.
+        # Les indicateurs isNull distinguent (a, null) de (null, a), que xxhash64
+        # confond (il ignore les valeurs nulles).
+        all_cols = [_col(f.name) for f in df.schema.fields]  # type: ignore[assignment]
+        distinct_rows = df.select(
+            F.xxhash64(*all_cols, *[c.isNull() for c in all_cols]).alias("h")
+        ).distinct().count()
+        duplicate_row_count = int(row_count - distinct_rows)
+
+        # 7) Suggestions simples
         suggestions: List[str] = []
         if constant_columns:
             suggestions.append(
@@ -116,6 +314,22 @@ def analyze_csv_local(local_path: str) -> Dict[str, Any]:
                 + ", ".join(heavy_missing[:5])
                 + ("…" if len(heavy_missing) > 5 else "")
             )
+        if duplicate_row_count:
+            suggestions.append(
+                f"Supprimer {duplicate_row_count} ligne(s) dupliquée(s) "
+                f"({duplicate_row_count / row_count:.1%} du dataset)"
+            )
+        correlated = [
+            f"{corr_columns[i]}/{corr_columns[j]}" for i, j in pairs
+            if matrix[i][j] is not None and abs(matrix[i][j]) >= HIGH_CORRELATION
+        ]
+        if correlated:
+            suggestions.append(
+                f"Colonnes fortement corrélées (|r| ≥ {HIGH_CORRELATION}), "
+                "une des deux peut être redondante: "
+                + ", ".join(correlated[:5])
+                + ("…" if len(correlated) > 5 else "")
+            )
 
         return {
             "row_count": int(row_count),
@@ -125,7 +339,15 @@ def analyze_csv_local(local_path: str) -> Dict[str, Any]:
             "bad_type_counts": bad_type_counts,
             "distinct_counts": {k: int(v) for k, v in distinct_counts.items()},
             "constant_columns": constant_columns,
+            "correlations": {"columns": corr_columns, "matrix": matrix},
+            "duplicate_row_count": duplicate_row_count,
             "suggestions": suggestions,
+            "spark_profile": profile,
         }
+    except Exception:
+        if cancelled.is_set():
+            raise DatasetCancelled("Analyse Spark annulée")
+        raise
     finally:
+        stop.set()
         spark.stop()
@@ -0,0 +1,104 @@
+# backend/app/services/spark/spark_query.py
+from __future__ import annotations
+import os
+from typing import Any, Dict, List
+from pyspark.sql import Column, DataFrame  # type: ignore
+from pyspark.sql import functions as F  # type: ignore
+from ..query_dsl import DatasetQuery, QueryFilter, required_columns
+from .spark_analyze import _col, _spark, _spark_charset, choose_spark_profile
+
+_AGGREGATES = {
+    "sum": F.sum,
+    "avg": F.avg,
+    "min": F.min,
+    "max": F.max,
+    "count_distinct": F.countDistinct,
+}
+
+
+def _ddl(schema: List[Dict[str, str]]) -> str:
+    # schéma connu (analyse initiale): évite la passe d'inferSchema
+    return ", ".join(f"`{f['name'].replace('`', '``')}` {f['dtype']}" for f in schema)
+
+
+def _predicate(f: QueryFilter) -> Column:
+    col = _col(f.column)
+    if f.op == "=":
+        return col == f.value
+    if f.op == "!=":
+        return col != f.value
+    if f.op == "<":
+        return col < f.value
+    if f.op == "<=":
+        return col <= f.value
+    if f.op == ">":
+        return col > f.value
+    if f.op == ">=":
+        return col >= f.value
+    if f.op == "in":
+        return col.isin(f.value)
+    if f.op == "not_in":
+        return ~col.isin(f.value)
+    if f.op == "is_null":
+        return col.isNull()
+    if f.op == "not_null":
+        return col.isNotNull()
+    return col.contains(str(f.value))  # contains
+
+
+def _apply(df: DataFrame, query: DatasetQuery) -> DataFrame:
+    for f in query.where:
+        df = df.filter(_predicate(f))
+
+    if query.group_by or query.aggregations:
+        aggs = [
+            (F.count(F.lit(1)) if a.column is None
+             else F.count(_col(a.column)) if a.fn == "count"
+             else _AGGREGATES[a.fn](_col(a.column))).alias(a.output_name)
+            for a in query.aggregations
+        ]
+        grouped = df.groupBy(*[_col(c) for c in query.group_by])
+        df = grouped.agg(*aggs) if aggs else grouped.count().drop("count")
+    elif query.select:
+        df = df.select(*[_col(c) for c in query.select])
+
+    if query.order_by:
+        # noms exacts (colonnes groupées ou alias d'agrégat), cf. _col
+        df = df.orderBy(*[_col(o.column).desc() if o.desc else _col(o.column).asc()
+                          for o in query.order_by])
+    return df
+
+
+def run_query(local_path: str, schema: List[Dict[str, str]], query: DatasetQuery,
+              max_rows: int, sep: str = ",", encoding: str = "utf-8") -> Dict[str, Any]:
+    """
+    Exécute la requête sur le CSV local et renvoie:
+      - columns: [str]
+      - rows: [[valeur, ...]] (au plus max_rows)
+      - truncated: True si le résultat dépasse max_rows
+    Seules les colonnes utiles sont lues: Spark ne parse que celles-ci (column
+    pruning du lecteur CSV) et pousse les filtres simples dans le parseur.
+    """
+    names = [f["name"] for f in schema]
+    needed = required_columns(query, names)
+    spark = _spark(choose_spark_profile(os.path.getsize(local_path), len(needed)))
+    try:
+        df = (
+            spark.read
+            .option("header", True)
+            .option("sep", sep)
+            .option("encoding", _spark_charset(encoding))
+            .schema(_ddl(schema))
+            .csv(local_path)
+            .select(*[_col(c) for c in needed])
+        )
+        df = _apply(df, query)
+        limit = min(query.limit or max_rows, max_rows)
+        collected = df.limit(limit + 1).collect()
+        return {
+            "columns": df.columns,
+            "rows": [list(r) for r in collected[:limit]],
+            "truncated": len(collected) > limit and (query.limit or 0) != limit,
+        }
+    finally:
+        spark.stop()
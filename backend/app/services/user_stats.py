@@ -0,0 +1,111 @@
+"""
+Compteurs d'usage par utilisateur (`user_stats`, _id = user_id).
+
+Mis à jour par $inc atomiques au lieu de scanner `datasets_infos`:
+  - dataset_count / total_rows / total_bytes: datasets analysés (done) non archivés
+  - failed_count: nombre cumulé de traitements en échec
+
+Idempotence: le drapeau `usage_counted` du dataset garantit qu'un dataset n'est
+compté qu'une fois (retry Celery, double archivage...). Les datasets antérieurs
+aux compteurs (sans ce drapeau) sont repris par `backfill_user_stats` au démarrage.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+from bson import ObjectId  # type: ignore
+
+COUNTERS = ("dataset_count", "total_rows", "total_bytes", "failed_count")
+
+
+def _inc(database, user_oid: ObjectId, inc: Dict[str, int]) -> None:
+    database.user_stats.update_one(
+        {"_id": user_oid},
+        {"$inc": inc, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def record_dataset_outcome(database, dataset_oid: ObjectId, status: str) -> None:
+    """Compte un dataset terminé (done/failed) une seule fois."""
+    info = database.datasets_infos.find_one_and_update(
+        {"_id": dataset_oid, "usage_counted": {"$ne": True}, "archived_at": None},
+        {"$set": {"usage_counted": True}},
+        projection={"user_id": 1, "row_count": 1, "size_bytes": 1},
+    )
+    if not info:
+        return
+    if status == "done":
+        _inc(database, info["user_id"], {
+            "dataset_count": 1,
+            "total_rows": int(info.get("row_count") or 0),
+            "total_bytes": int(info.get("size_bytes") or 0),
+        })
+    else:
+        _inc(database, info["user_id"], {"failed_count": 1})
+
+
+def release_archived(database, user_oid: ObjectId, query: Dict[str, Any]) -> None:
+    """
+    Décompte les datasets archivés correspondant à `query` (un _id ou un
+    archive_token). Les datasets done sont agrégés en un seul $inc.
+    L'archivage (archived_at: None -> date) étant atomique et
+    record_dataset_outcome ignorant les datasets archivés, chaque dataset
+    n'est décompté qu'une fois.
+    """
+    match = {**query, "user_id": user_oid, "usage_counted": True, "status": "done"}
+    totals = list(database.datasets_infos.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": None,
+            "ids": {"$push": "$_id"},
+            "rows": {"$sum": {"$ifNull": ["$row_count", 0]}},
+            "bytes": {"$sum": {"$ifNull": ["$size_bytes", 0]}},
+        }},
+    ]))
+    if not totals:
+        return
+    t = totals[0]
+    database.datasets_infos.update_many(
+        {"_id": {"$in": t["ids"]}}, {"$set": {"usage_counted": False}})
+    _inc(database, user_oid, {
+        "dataset_count": -len(t["ids"]),
+        "total_rows": -int(t["rows"]),
+        "total_bytes": -int(t["bytes"]),
+    })
+
+
+def backfill_user_stats(database) -> int:
+    """
+    Intègre aux compteurs les datasets terminés antérieurs à `user_stats`
+    (done/failed, non archivés, sans drapeau usage_counted). Idempotent et sûr
+    entre plusieurs process API: les datasets sont d'abord marqués avec un jeton
+    (un seul process peut les marquer), puis seuls ceux-là sont agrégés.
+    Renvoie le nombre de datasets intégrés.
+    """
+    token = uuid.uuid4().hex
+    res = database.datasets_infos.update_many(
+        {"status": {"$in": ["done", "failed"]}, "archived_at": None,
+         "usage_counted": {"$exists": False}},
+        {"$set": {"usage_counted": True, "usage_backfill": token}},
+    )
+    if not res.modified_count:
+        return 0
+    for t in database.datasets_infos.aggregate([
+        {"$match": {"usage_backfill": token}},
+        {"$group": {
+            "_id": "$user_id",
+            "done": {"$sum": {"$cond": [{"$eq": ["$status", "done"]}, 1, 0]}},
+            "failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}},
+            "rows": {"$sum": {"$cond": [{"$eq": ["$status", "done"]},
+                                        {"$ifNull": ["$row_count", 0]}, 0]}},
+            "bytes": {"$sum": {"$cond": [{"$eq": ["$status", "done"]},
+                                         {"$ifNull": ["$size_bytes", 0]}, 0]}},
+        }},
+    ]):
+        _inc(database, t["_id"], {
+            "dataset_count": int(t["done"]),
+            "total_rows": int(t["rows"]),
+            "total_bytes": int(t["bytes"]),
+            "failed_count": int(t["failed"]),
+        })
+    return res.modified_count
@@ -1,13 +1,26 @@
 from __future__ import annotations
+import hashlib
+import json
 import os
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List
 from bson import ObjectId  # type: ignore
-from hdfs.util import HdfsError  # type: ignore
 from pymongo import MongoClient  # type: ignore
 from ..celery_app import celery_app
-from ..services.hdfs_client import get_hdfs_client, get_hdfs_client_as
-from ..services.spark.spark_analyze import analyze_csv_local
+from ..services.analysis_store import load_analysis, save_analysis
+from ..services.cache import (
+    cache_dataset_detail,
+    detail_generation,
+    invalidate_details,
+    set_query_failed,
+    set_query_result,
+)
+from ..services.cancellation import CancellableReader, DatasetCancelled, is_cancel_requested
+from ..services.dataset_detail import load_dataset_detail
+from ..services.hdfs_client import get_hdfs_client, get_hdfs_client_as, upload_file
+from ..services.hdfs_setup import ensure_dataset_dir
+from ..services.memory import PeakRssSampler
+from ..services.user_stats import record_dataset_outcome
 from ..config import settings
 
 
@@ -26,92 +39,191 @@ def _update_status(dataset_oid: ObjectId, status: str, extra: Dict[str, Any] | N
     _db().datasets_infos.update_one({"_id": dataset_oid}, {"$set": data})
 
 
-@celery_app.task(name="datasets.process_csv")
-def process_csv_task(dataset_id: str, user_id: str, local_path: str, filename: str) -> Dict[str, Any]:
+# Statuts "en cours" dans lesquels une reprise (retry) retrouve le dataset
+RUNNING_STATUSES = ["uploading_hdfs", "analyzing"]
+
+
+def _transient_errors() -> tuple:
+    """
+    Erreurs d'infrastructure qui justifient une reprise (réseau HDFS/Mongo, JVM
+    py4j). Les autres (données invalides, erreur d'analyse Spark...) échoueraient
+    à l'identique: le dataset passe directement en failed.
     """
-    Pipeline:
+    from hdfs.util import HdfsError  # type: ignore
+    from pymongo.errors import ConnectionFailure, NetworkTimeout  # type: ignore
+    from requests.exceptions import ConnectionError, Timeout  # type: ignore
+
+    errors: tuple = (HdfsError, ConnectionFailure, NetworkTimeout, ConnectionError, Timeout)
+    try:
+        from py4j.protocol import Py4JNetworkError  # type: ignore
+        errors += (Py4JNetworkError,)
+    except ImportError:
+        pass
+    return errors
+
+
+def _checkpoint(dataset_oid: ObjectId, stage: str, data: Dict[str, Any] | None = None) -> None:
+    """Enregistre une étape terminée dans datasets_infos.checkpoints.<stage>."""
+    now = datetime.utcnow()
+    _db().datasets_infos.update_one(
+        {"_id": dataset_oid},
+        {"$set": {f"checkpoints.{stage}": {"at": now, **(data or {})}, "updated_at": now}},
+    )
+
+
+def _md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hdfs_size(hdfs_path: str) -> int | None:
+    status = get_hdfs_client().status(hdfs_path, strict=False)
+    return status["length"] if status else None
+
+
+@celery_app.task(
+    name="datasets.process_csv",
+    bind=True,
+    max_retries=settings.process_max_retries,
+)
+def process_csv_task(self, dataset_id: str, user_id: str, local_path: str, filename: str,
+                     delimiter: str = ",", encoding: str = "utf-8") -> Dict[str, Any]:
+    """
+    Pipeline (chaque étape terminée est un checkpoint dans datasets_infos.checkpoints):
       1) Crée le dossier HDFS /user_datasets/<user_id>/<dataset_id> (avec fallback admin si besoin)
-      2) Upload le CSV vers HDFS (raw.csv)
-      3) Analyse locale via PySpark (schema, nulls, types, etc.)
+         -> checkpoints.hdfs_dir
+      2) Upload le CSV vers HDFS (raw.csv) -> checkpoints.uploaded {md5, size}
+      3) Analyse locale via PySpark (schema, nulls, types, etc.), copiée sur HDFS
+         (analysis.json) -> checkpoints.analyzed
       4) Enregistre l'analyse détaillée dans 'datasets_initial_analyze'
-      5) Met à jour 'datasets_infos' (row_count, column_count, status=done)
+      5) Met à jour 'datasets_infos' (row_count, column_count, status=done) -> checkpoints.persisted
+
+    En cas d'erreur transitoire (réseau HDFS/Mongo, JVM py4j), la tâche est relancée
+    avec backoff (PROCESS_MAX_RETRIES) et reprend après le dernier checkpoint: raw.csv est relu depuis HDFS si le fichier local a
+    disparu, l'analyse depuis analysis.json si elle était déjà calculée.
+    Le fichier local n'est supprimé qu'à l'issue définitive (done/failed/cancelled).
     """
     dataset_oid = ObjectId(dataset_id)
     user_oid = ObjectId(user_id)
 
-    try:
-        _update_status(dataset_oid, "uploading_hdfs")
+    # Chemins HDFS
+    hdfs_dir = f"{settings.hdfs_base_dir}/{user_id}/{dataset_id}"
+    hdfs_file = f"{hdfs_dir}/raw.csv"
+    hdfs_analysis = f"{hdfs_dir}/analysis.json"
 
-        # --- 1) Prépare chemins HDFS
-        hdfs_dir = f"{settings.hdfs_base_dir}/{user_id}/{dataset_id}"
-        hdfs_file = f"{hdfs_dir}/raw.csv"
+    # Une seule connexion pour les vérifications périodiques d'annulation
+    cancel_db = _db()
 
-        # Client applicatif (user = hdfs par défaut)
-        user_client = get_hdfs_client()
+    def should_cancel() -> bool:
+        return is_cancel_requested(cancel_db, dataset_oid)
 
-        # Tente la création en user applicatif
-        try:
-            user_client.makedirs(hdfs_dir)
-        except HdfsError as e:
-            # Fallback: corrige les droits avec l'admin (root)
-            if "Permission denied" in str(e):
-                admin = get_hdfs_client_as(settings.hdfs_admin_user)
-
-                # S'assure que le répertoire base existe et a des droits larges
-                try:
-                    admin.makedirs(settings.hdfs_base_dir,
-                                   permission=777)  # drwxrwxrwx
-                except HdfsError as ie:
-                    if "File exists" not in str(ie):
-                        raise
-
-                # Normalise owner/perms sur la base
-                try:
-                    admin.set_owner(settings.hdfs_base_dir,
-                                    owner=settings.hdfs_user, group="supergroup")
-                except Exception:
-                    pass
-                try:
-                    admin.set_permission(
-                        settings.hdfs_base_dir, permission=777)
-                except Exception:
-                    pass
-
-                # Crée le sous-dossier cible avec admin, puis remet owner/perms
-                admin.makedirs(hdfs_dir, permission=775)  # drwxrwxr-x
-                try:
-                    admin.set_owner(
-                        hdfs_dir, owner=settings.hdfs_user, group="supergroup")
-                except Exception:
-                    pass
-                try:
-                    admin.set_permission(hdfs_dir, permission=775)
-                except Exception:
-                    pass
-            else:
-                raise
-
-        # --- 2) Upload du fichier vers HDFS
-        with open(local_path, "rb") as f:
-            user_client.write(hdfs_file, f, overwrite=True)
+    # Pic mémoire (worker + JVM Spark) de la tâche, enregistré dans datasets_infos
+    sampler = PeakRssSampler().start()
+    # True si une reprise est programmée: le fichier local sert encore
+    keep_local = False
 
+    try:
+        # --- 0) Démarrage
+        started_at = datetime.utcnow()
+        info = None
+        if self.request.retries == 0:
+            # queued -> uploading_hdfs (atomique vs POST /cancel)
+            info = _db().datasets_infos.find_one_and_update(
+                {"_id": dataset_oid, "status": "queued",
+                    "cancel_requested": {"$ne": True}},
+                {"$set": {"status": "uploading_hdfs",
+                          "started_at": started_at, "updated_at": started_at}},
+                projection={"queued_at": 1, "checkpoints": 1},
+            )
+            # Temps passé dans la file (exposé par /queues)
+            if info and info.get("queued_at"):
+                _update_status(dataset_oid, "uploading_hdfs", {
+                    "queue_wait_seconds": (started_at - info["queued_at"]).total_seconds(),
+                })
+        if not info:
+            # Reprise (retry) ou re-livraison après perte du worker (acks tardifs,
+            # ex: OOM): le dataset est resté dans son dernier statut en cours
+            info = _db().datasets_infos.find_one(
+                {"_id": dataset_oid},
+                projection={"status": 1, "checkpoints": 1,
+                            "cancel_requested": 1, "archived_at": 1},
+            )
+            if not info or info["status"] not in ["queued", *RUNNING_STATUSES]:
+                # Déjà terminé (ou purgé): rien à refaire
+                return {"dataset_id": dataset_id, "status": info and info["status"]}
+            if info.get("cancel_requested") or info.get("archived_at"):
+                if info["status"] == "queued":
+                    # Annulé (ou archivé) avant d'être pris par un worker
+                    return {"dataset_id": dataset_id, "cancelled": True}
+                # Annulation demandée pendant l'interruption: nettoyage HDFS
+                raise DatasetCancelled("Traitement annulé")
+            if info["status"] == "queued":
+                _update_status(dataset_oid, "uploading_hdfs",
+                               {"started_at": started_at})
+        checkpoints: Dict[str, Any] = info.get("checkpoints") or {}
+
+        # --- 1) Crée le dossier HDFS (fallback admin si besoin, état mis en cache)
+        if "hdfs_dir" not in checkpoints:
+            ensure_dataset_dir(user_id, dataset_id)
+            _checkpoint(dataset_oid, "hdfs_dir")
+
+        # --- 2) Upload du fichier vers HDFS (streaming, interrompu si annulation)
+        # Checkpoint valide seulement si raw.csv est bien présent avec la bonne taille
+        uploaded = checkpoints.get("uploaded")
+        if not uploaded or _hdfs_size(hdfs_file) != uploaded["size"]:
+            _update_status(dataset_oid, "uploading_hdfs")
+            uploaded = {"md5": _md5(local_path),
+                        "size": os.path.getsize(local_path)}
+            upload_file(hdfs_file, local_path,
+                        wrap=lambda raw: CancellableReader(raw, should_cancel))
+            _checkpoint(dataset_oid, "uploaded", uploaded)
+
+        if should_cancel():
+            raise DatasetCancelled("Traitement annulé")
         _update_status(dataset_oid, "analyzing", {"hdfs_path": hdfs_file})
 
-        # --- 3) Analyse Spark locale
-        analysis = analyze_csv_local(local_path)
+        # --- 3) Analyse Spark locale (ou relue depuis le checkpoint HDFS)
+        if "analyzed" in checkpoints:
+            with get_hdfs_client().read(hdfs_analysis, encoding="utf-8") as reader:
+                analysis = json.load(reader)
+        else:
+            if not os.path.exists(local_path):
+                # Fichier temporaire perdu (autre worker, nettoyage): on repart de HDFS
+                get_hdfs_client().download(hdfs_file, local_path, overwrite=True)
+                if _md5(local_path) != uploaded["md5"]:
+                    from hdfs.util import HdfsError  # type: ignore
+                    raise HdfsError(f"Checksum HDFS invalide pour {hdfs_file}")
+
+            # Import lourd (pyspark) différé: le worker démarre sans charger la JVM/py4j
+            from ..services.spark.spark_analyze import analyze_csv_local
+
+            analysis = analyze_csv_local(
+                local_path, sep=delimiter, encoding=encoding, should_cancel=should_cancel)
+            if should_cancel():
+                raise DatasetCancelled("Traitement annulé")
+            get_hdfs_client().write(hdfs_analysis, data=json.dumps(analysis),
+                                    overwrite=True, encoding="utf-8")
+            _checkpoint(dataset_oid, "analyzed", {"path": hdfs_analysis})
+        peak_rss_mb = sampler.stop()
         # analysis contient au minimum:
         #   row_count, column_count, schema, null_counts, bad_type_counts,
         #   distinct_counts, constant_columns, suggestions
 
-        # --- 4) Enregistrement résultats détaillés
-        analysis_doc: Dict[str, Any] = {
+        # --- 4) Enregistrement résultats détaillés (idempotent: remplace l'existant)
+        # (format compact: stats par colonne en tableaux, cf. analysis_store)
+        base_doc: Dict[str, Any] = {
             "dataset_id": dataset_oid,
             "user_id": user_oid,
             "generated_at": datetime.utcnow(),
             "hdfs_path": hdfs_file,
-            **analysis,
         }
-        _db().datasets_initial_analyze.insert_one(analysis_doc)
+        # Dernier contrôle avant d'écrire dans Mongo (annulation ou archivage)
+        if should_cancel():
+            raise DatasetCancelled("Traitement annulé")
+        save_analysis(_db(), base_doc, analysis)
 
         # --- 5) MAJ dataset_infos
         _update_status(
@@ -120,17 +232,191 @@ def process_csv_task(dataset_id: str, user_id: str, local_path: str, filename: s
             {
                 "row_count": analysis.get("row_count"),
                 "column_count": analysis.get("column_count"),
+                "peak_rss_mb": peak_rss_mb,
+                "checkpoints.persisted": {"at": datetime.utcnow()},
             },
         )
+        # Compteurs par utilisateur (best effort: le dataset reste done)
+        try:
+            record_dataset_outcome(_db(), dataset_oid, "done")
+        except Exception:
+            pass
+
+        # --- 6) Write-through du cache détail (sert GET /datasets/{id} sans Mongo)
+        try:
+            generation = detail_generation(dataset_id)
+            detail = load_dataset_detail(_db(), dataset_oid, user_oid)
+            if detail:
+                cache_dataset_detail(user_id, detail, generation)
+        except Exception:
+            pass
 
         return {"dataset_id": dataset_id, "hdfs_path": hdfs_file, **analysis}
 
+    except DatasetCancelled:
+        # Annulation: on libère HDFS (fichier partiel) et on passe en cancelled
+        try:
+            get_hdfs_client_as(settings.hdfs_admin_user).delete(
+                hdfs_dir, recursive=True)
+        except Exception:
+            pass
+        _update_status(dataset_oid, "cancelled", {"hdfs_path": None})
+        return {"dataset_id": dataset_id, "cancelled": True}
+    except Exception as e:
+        retries = self.request.retries
+        if retries < self.max_retries and isinstance(e, _transient_errors()):
+            # Erreur transitoire: reprise depuis le dernier checkpoint
+            keep_local = True
+            _db().datasets_infos.update_one(
+                {"_id": dataset_oid},
+                {"$set": {"last_error": str(e), "retry_count": retries + 1,
+                          "updated_at": datetime.utcnow()}},
+            )
+            raise self.retry(exc=e, countdown=min(300, 10 * 2 ** retries))
+        # Échec définitif: on passe en failed + message
+        _update_status(dataset_oid, "failed", {
+            "error_message": str(e), "peak_rss_mb": sampler.stop()})
+        try:
+            record_dataset_outcome(_db(), dataset_oid, "failed")
+        except Exception:
+            pass
+        raise
+    finally:
+        sampler.stop()
+        # Nettoyage fichier temporaire (sauf si une reprise va le relire)
+        if not keep_local:
+            try:
+                os.remove(local_path)
+            except Exception:
+                pass
+
+
+@celery_app.task(
+    name="datasets.purge",
+    bind=True,
+    max_retries=settings.purge_max_retries,
+)
+def purge_datasets_task(self, user_id: str, dataset_ids: List[str]) -> Dict[str, Any]:
+    """
+    Purge des datasets archivés (soft-delete déjà appliqué côté API):
+      1) Supprime les dossiers HDFS /user_datasets/<user_id>/<dataset_id> (un seul client admin)
+      2) Supprime en lot (delete_many) l'analyse et l'info des datasets purgés
+      3) Relance avec backoff les datasets dont la purge a échoué sur une erreur
+         de transport HDFS/Mongo; toute autre erreur fait échouer la tâche
+    Un dataset archivé pendant son traitement (cancel_requested) n'est purgé qu'une
+    fois la tâche arrêtée: sinon elle recréerait raw.csv/analysis.json après la purge.
+    Il est replanifié dans une nouvelle tâche, sans consommer PURGE_MAX_RETRIES.
+    """
+    transient = _transient_errors()
+    countdown = min(600, 5 * 2 ** self.request.retries)
+    try:
+        database = _db()
+        running = {
+            str(d["_id"])
+            for d in database.datasets_infos.find(
+                {"_id": {"$in": [ObjectId(i) for i in dataset_ids]},
+                 "status": {"$in": RUNNING_STATUSES}},
+                projection={"_id": 1},
+            )
+        }
+    except transient as e:
+        raise self.retry(exc=e, countdown=countdown)
+
+    if running:
+        purge_datasets_task.apply_async(
+            kwargs={"user_id": user_id, "dataset_ids": sorted(running)},
+            countdown=settings.purge_running_recheck_seconds,
+        )
+
+    admin = get_hdfs_client_as(settings.hdfs_admin_user)
+    purged: List[str] = []
+    failed: Dict[str, str] = {}
+    for dataset_id in dataset_ids:
+        if dataset_id in running:
+            continue
+        dir_path = f"{settings.hdfs_base_dir}/{user_id}/{dataset_id}"
+        try:
+            # delete() renvoie False si le dossier n'existe pas: rien à purger
+            admin.delete(dir_path, recursive=True)
+            purged.append(dataset_id)
+        except transient as e:
+            failed[dataset_id] = str(e)
+
+    try:
+        if purged:
+            # détail encore en cache (TTL DETAIL_CACHE_TTL_SECONDS): plus servi
+            invalidate_details(user_id, purged)
+            oids = [ObjectId(i) for i in purged]
+            database.datasets_initial_analyze.delete_many(
+                {"dataset_id": {"$in": oids}})
+            database.datasets_column_stats.delete_many(
+                {"dataset_id": {"$in": oids}})
+            database.datasets_infos.delete_many(
+                {"_id": {"$in": oids}, "archived_at": {"$ne": None}})
+
+        # On garde la trace de l'erreur (le dataset reste masqué côté API)
+        for dataset_id, error in failed.items():
+            database.datasets_infos.update_one(
+                {"_id": ObjectId(dataset_id)},
+                {"$set": {"purge_error": error, "updated_at": datetime.utcnow()}},
+            )
+    except transient as e:
+        # Purge HDFS idempotente: on rejoue aussi les datasets déjà supprimés
+        raise self.retry(
+            kwargs={"user_id": user_id, "dataset_ids": purged + list(failed)},
+            exc=e, countdown=countdown,
+        )
+
+    if failed:
+        from hdfs.util import HdfsError  # type: ignore
+
+        raise self.retry(
+            kwargs={"user_id": user_id, "dataset_ids": list(failed)},
+            exc=HdfsError("; ".join(failed.values())),
+            countdown=countdown,
+        )
+
+    return {"purged": purged, "rescheduled": sorted(running)}
+
+
+@celery_app.task(name="datasets.query")
+def query_dataset_task(dataset_id: str, user_id: str, query: Dict[str, Any], query_hash: str) -> Dict[str, Any]:
+    """
+    Requête ad-hoc (DSL JSON déjà validé par l'API):
+      1) Rapatrie raw.csv depuis HDFS dans le dossier temporaire
+      2) Exécute la requête via PySpark (schéma connu, colonnes élaguées)
+      3) Met le résultat en cache Redis (clé = dataset + hash de requête)
+    """
+    from ..services.query_dsl import DatasetQuery
+    from ..services.spark.spark_query import run_query
+
+    dataset_oid = ObjectId(dataset_id)
+    local_path = os.path.join(
+        settings.upload_tmp_dir, f"query-{dataset_id}-{query_hash}.csv")
+    try:
+        database = _db()
+        info = database.datasets_infos.find_one(
+            {"_id": dataset_oid}, projection={"hdfs_path": 1, "delimiter": 1, "encoding": 1})
+        analysis = load_analysis(
+            database, dataset_oid, ObjectId(user_id), fields=["schema"])
+        if not info or not info.get("hdfs_path") or not analysis:
+            raise ValueError("Dataset introuvable ou non analysé")
+
+        get_hdfs_client().download(info["hdfs_path"], local_path, overwrite=True)
+        result = run_query(
+            local_path,
+            analysis["schema"],
+            DatasetQuery(**query),
+            settings.query_max_result_rows,
+            sep=info.get("delimiter") or ",",
+            encoding=info.get("encoding") or "utf-8",
+        )
+        set_query_result(dataset_id, query_hash, result)
+        return {"dataset_id": dataset_id, "query_id": query_hash, "rows": len(result["rows"])}
     except Exception as e:
-        # En cas d'erreur on passe en failed + message
-        _update_status(dataset_oid, "failed", {"error_message": str(e)})
+        set_query_failed(dataset_id, query_hash, str(e))
         raise
     finally:
-        # Nettoyage fichier temporaire
         try:
             os.remove(local_path)
         except Exception:
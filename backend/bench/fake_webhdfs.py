@@ -0,0 +1,190 @@
+"""
+Faux serveur WebHDFS en mémoire (namenode + datanode dans le même process).
+
+Implémente les opérations utilisées par l'app via la lib `hdfs`:
+MKDIRS, CREATE (redirection 307 comme un vrai namenode), OPEN (offset/length),
+GETFILESTATUS, LISTSTATUS, DELETE, RENAME, CONCAT, SETOWNER, SETPERMISSION.
+"""
+from __future__ import annotations
+
+import json
+import posixpath
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+PREFIX = "/webhdfs/v1"
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.files: Dict[str, bytes] = {}
+        self.dirs = {"/"}
+
+    def mkdirs(self, path: str) -> None:
+        while path not in ("", "/"):
+            self.dirs.add(path)
+            path = posixpath.dirname(path)
+
+    def status(self, path: str) -> Dict[str, object] | None:
+        now = int(time.time() * 1000)
+        base = {"owner": "hdfs", "group": "supergroup", "permission": "755",
+                "modificationTime": now, "accessTime": now, "replication": 1,
+                "blockSize": 128 * 1024 * 1024,
+                "pathSuffix": posixpath.basename(path)}
+        if path in self.files:
+            return {**base, "type": "FILE", "length": len(self.files[path])}
+        if path in self.dirs:
+            return {**base, "type": "DIRECTORY", "length": 0}
+        return None
+
+    def delete(self, path: str) -> bool:
+        found = path in self.files or path in self.dirs
+        prefix = path.rstrip("/") + "/"
+        self.files = {p: d for p, d in self.files.items()
+                      if p != path and not p.startswith(prefix)}
+        self.dirs = {d for d in self.dirs if d != path and not d.startswith(prefix)}
+        return found
+
+
+class _Handler(BaseHTTPRequestHandler):
+    store: _Store
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:  # silencieux
+        pass
+
+    # -- helpers
+    def _parse(self) -> Tuple[str, Dict[str, str]]:
+        url = urlparse(self.path)
+        path = url.path[len(PREFIX):] or "/"
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        params["op"] = params.get("op", "").upper()
+        return posixpath.normpath(path), params
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            out = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(out)
+                out += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, code: int, payload: object = None, raw: bytes | None = None,
+              headers: Dict[str, str] | None = None) -> None:
+        body = raw if raw is not None else (
+            json.dumps(payload).encode() if payload is not None else b"")
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type",
+                         "application/octet-stream" if raw is not None else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code: int, exception: str, message: str) -> None:
+        self._send(code, {"RemoteException": {
+            "exception": exception, "javaClassName": f"java.io.{exception}",
+            "message": message}})
+
+    # -- verbs
+    def do_GET(self) -> None:
+        path, params = self._parse()
+        st = self.store
+        with st.lock:
+            if params["op"] == "GETFILESTATUS":
+                status = st.status(path)
+                if status is None:
+                    return self._error(404, "FileNotFoundException", f"File does not exist: {path}")
+                return self._send(200, {"FileStatus": status})
+            if params["op"] == "LISTSTATUS":
+                if path not in st.dirs:
+                    return self._error(404, "FileNotFoundException", f"File does not exist: {path}")
+                children = {p for p in list(st.files) + list(st.dirs)
+                            if posixpath.dirname(p) == path and p != path}
+                return self._send(200, {"FileStatuses": {
+                    "FileStatus": [st.status(c) for c in sorted(children)]}})
+            if params["op"] == "OPEN":
+                if path not in st.files:
+                    return self._error(404, "FileNotFoundException", f"File does not exist: {path}")
+                data = st.files[path]
+                offset = int(params.get("offset", 0))
+                length = params.get("length")
+                end = offset + int(length) if length else len(data)
+                return self._send(200, raw=data[offset:end])
+        self._error(400, "IllegalArgumentException", f"Unsupported op {params['op']}")
+
+    def do_PUT(self) -> None:
+        path, params = self._parse()
+        st = self.store
+        op = params["op"]
+        if op == "CREATE" and "_datanode" not in params:
+            self._body()
+            # comme un namenode: redirection vers le "datanode"
+            query = urlencode({**params, "_datanode": "1"})
+            location = f"http://{self.headers['Host']}{PREFIX}{path}?{query}"
+            return self._send(307, headers={"Location": location})
+        body = self._body()
+        with st.lock:
+            if op == "CREATE":
+                if path in st.files and params.get("overwrite", "false").lower() != "true":
+                    return self._error(403, "FileAlreadyExistsException", f"{path} already exists")
+                st.mkdirs(posixpath.dirname(path))
+                st.files[path] = body
+                return self._send(201)
+            if op == "MKDIRS":
+                if path in st.files:
+                    return self._error(403, "FileAlreadyExistsException", f"{path} is a file")
+                st.mkdirs(path)
+                return self._send(200, {"boolean": True})
+            if op in ("SETOWNER", "SETPERMISSION"):
+                if st.status(path) is None:
+                    return self._error(404, "FileNotFoundException", f"File does not exist: {path}")
+                return self._send(200)
+            if op == "RENAME":
+                dest = posixpath.normpath(params["destination"])
+                if path in st.files and dest not in st.files:
+                    st.mkdirs(posixpath.dirname(dest))
+                    st.files[dest] = st.files.pop(path)
+                    return self._send(200, {"boolean": True})
+                return self._send(200, {"boolean": False})
+        self._error(400, "IllegalArgumentException", f"Unsupported op {op}")
+
+    def do_POST(self) -> None:
+        path, params = self._parse()
+        self._body()
+        st = self.store
+        with st.lock:
+            if params["op"] == "CONCAT":
+                sources = [posixpath.normpath(s) for s in params["sources"].split(",")]
+                if path not in st.files or any(s not in st.files for s in sources):
+                    return self._error(404, "FileNotFoundException", "concat: missing file")
+                st.files[path] += b"".join(st.files.pop(s) for s in sources)
+                return self._send(200)
+        self._error(400, "IllegalArgumentException", f"Unsupported op {params['op']}")
+
+    def do_DELETE(self) -> None:
+        path, params = self._parse()
+        with self.store.lock:
+            if params["op"] == "DELETE":
+                return self._send(200, {"boolean": self.store.delete(path)})
+        self._error(400, "IllegalArgumentException", f"Unsupported op {params['op']}")
+
+
+def start_fake_webhdfs(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Démarre le serveur dans un thread daemon; `server.server_address` donne le port."""
+    handler = type("FakeWebHdfsHandler", (_Handler,), {"store": _Store()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-webhdfs",
+                     daemon=True).start()
+    return server
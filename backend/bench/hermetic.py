@@ -0,0 +1,83 @@
+"""
+Environnement hermétique pour bencher l'API sans les conteneurs docker-compose.
+
+Remplace, *avant* l'import de `app`:
+  - MongoDB  -> mongomock (un seul client partagé, donc une seule base en mémoire)
+  - Redis    -> fakeredis (un seul FakeServer partagé: cache, limites, broker de résultats)
+  - WebHDFS  -> bench.fake_webhdfs (vrai serveur HTTP local, la lib `hdfs` est inchangée)
+  - Celery   -> "memory": tâches mises en file sans worker (statuts figés à queued)
+                "eager" : tâches exécutées dans le process de l'API (nécessite Java/PySpark)
+
+Dépendances: pip install -r bench/requirements.txt
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Any
+
+
+def setup(celery_mode: str = "memory") -> Any:
+    """Prépare l'environnement et renvoie l'application FastAPI (`app.main.app`)."""
+    import fakeredis  # type: ignore
+    import mongomock  # type: ignore
+    import pymongo  # type: ignore
+    import redis  # type: ignore
+
+    from .fake_webhdfs import start_fake_webhdfs
+
+    hdfs = start_fake_webhdfs()
+    os.environ.update({
+        "JWT_SECRET": os.environ.get("JWT_SECRET", "loadtest-secret-0123456789abcdef0123"),
+        "MONGO_URI": "mongodb://localhost:27017/ia_loadtest",
+        "MONGO_DB_NAME": "ia_loadtest",
+        "REDIS_URL": "redis://localhost:6379/0",
+        "HADOOP_HOST": hdfs.server_address[0],
+        "HADOOP_PORT": str(hdfs.server_address[1]),
+        "UPLOAD_TMP_DIR": tempfile.mkdtemp(prefix="ia_loadtest_"),
+        # pas de limite de débit côté bench
+        "MAX_INFLIGHT_DATASETS_PER_USER": "1000000",
+        "LOGIN_RATE_LIMIT": os.environ.get("LOGIN_RATE_LIMIT", "1000000"),
+    })
+
+    # --- Mongo: toutes les instances de MongoClient partagent le même stockage
+    shared_mongo = mongomock.MongoClient(os.environ["MONGO_URI"])
+    pymongo.MongoClient = lambda *args, **kwargs: shared_mongo  # type: ignore
+
+    # --- Redis: toutes les connexions pointent vers le même serveur en mémoire
+    server = fakeredis.FakeServer()
+
+    class _SharedFakeRedis(fakeredis.FakeRedis):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            kwargs["server"] = server
+            super().__init__(*args, **kwargs)
+
+        @classmethod
+        def from_url(cls, *args: Any, **kwargs: Any) -> "_SharedFakeRedis":
+            return cls()
+
+    redis.Redis = _SharedFakeRedis  # type: ignore
+
+    # --- Import de l'app (après les patchs)
+    from app.celery_app import celery_app
+    from app import main
+
+    celery_app.conf.update(
+        broker_url="memory://",
+        result_backend="cache+memory://",
+        task_eager_propagates=False,
+    )
+    if celery_mode == "eager":
+        # send_task ignore task_always_eager: on exécute la tâche enregistrée en ligne
+        celery_app.loader.import_default_modules()
+
+        def _send_task(name: str, args: Any = None, kwargs: Any = None, **options: Any):
+            return celery_app.tasks[name].apply(args=args, kwargs=kwargs)
+
+        celery_app.send_task = _send_task  # type: ignore
+    elif celery_mode != "memory":
+        raise ValueError(f"Mode Celery inconnu: {celery_mode}")
+
+    # Le startup FastAPI n'est pas déclenché par le transport ASGI: init synchrone ici
+    main._init_backend()
+    return main.app
@@ -0,0 +1,144 @@
+"""
+Banc de charge hermétique de l'API HTTP (aucun conteneur requis, cf. bench/hermetic.py).
+
+Chaque utilisateur virtuel joue le scénario:
+    inscription -> login -> upload CSV -> polling du statut -> liste -> détail -> archivage
+et chaque requête est chronométrée par endpoint.
+
+Usage (depuis backend/):
+    pip install -r bench/requirements.txt
+    python -m bench.loadtest --users 20 --iterations 5
+    python -m bench.loadtest --users 50 --celery eager --rows 2000   # traitement réel (Java requis)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import math
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from . import hermetic
+
+Samples = Dict[str, List[float]]
+
+
+def _csv_bytes(rows: int, cols: int = 6) -> bytes:
+    header = ",".join(f"col_{i}" for i in range(cols))
+    lines = [header] + [",".join(str(r * cols + c) for c in range(cols))
+                        for r in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: Samples = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: Any, label: str, method: str, url: str,
+                   expected: Tuple[int, ...] = (200,), **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        res = await client.request(method, url, **kwargs)
+        self.samples[label].append(time.perf_counter() - start)
+        if res.status_code not in expected:
+            self.errors[f"{label} {res.status_code}"] += 1
+        return res
+
+
+async def _virtual_user(client: Any, rec: Recorder, iterations: int,
+                        csv_data: bytes, polls: int) -> None:
+    email = f"lt-{uuid.uuid4().hex[:12]}@example.com"
+    password = "loadtest-password"
+    await rec.call(client, "POST /users", "POST", "/users/",
+                   json={"username": email.split("@")[0], "email": email, "password": password})
+    res = await rec.call(client, "POST /auth/login", "POST", "/auth/login",
+                         data={"username": email, "password": password})
+    if res.status_code != 200:
+        return
+    auth = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+    for _ in range(iterations):
+        res = await rec.call(
+            client, "POST /datasets/upload", "POST", "/datasets/upload",
+            headers=auth, files={"file": ("bench.csv", csv_data, "text/csv")})
+        if res.status_code != 200:
+            continue
+        dataset_id = res.json()["dataset_id"]
+
+        for _ in range(polls):
+            res = await rec.call(client, "GET /datasets/{id}/status", "GET",
+                                 f"/datasets/{dataset_id}/status", headers=auth)
+            if res.status_code == 200 and res.json()["status"] in ("done", "failed"):
+                break
+
+        await rec.call(client, "GET /datasets", "GET", "/datasets/", headers=auth)
+        await rec.call(client, "GET /datasets/{id}", "GET",
+                       f"/datasets/{dataset_id}", headers=auth)
+        await rec.call(client, "DELETE /datasets/{id}", "DELETE",
+                       f"/datasets/{dataset_id}", headers=auth)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    # rang le plus proche
+    ordered = sorted(values)
+    k = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+
+def report(rec: Recorder, wall: float) -> None:
+    print(f"\n{'endpoint':<28}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'mean ms':>10}{'req/s':>10}")
+    total = 0
+    for label, values in sorted(rec.samples.items()):
+        total += len(values)
+        print(f"{label:<28}{len(values):>7}"
+              f"{_percentile(values, 50) * 1000:>10.1f}"
+              f"{_percentile(values, 95) * 1000:>10.1f}"
+              f"{_percentile(values, 99) * 1000:>10.1f}"
+              f"{statistics.mean(values) * 1000:>10.1f}"
+              f"{len(values) / wall:>10.1f}")
+    print(f"\n{total} requêtes en {wall:.2f} s -> {total / wall:.1f} req/s")
+    if rec.errors:
+        print("erreurs:", dict(rec.errors))
+
+
+async def run(app: Any, users: int, iterations: int, rows: int, polls: int) -> Tuple[Recorder, float]:
+    import httpx  # type: ignore
+
+    rec = Recorder()
+    csv_data = _csv_bytes(rows)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _virtual_user(client, rec, iterations, csv_data, polls)
+            for _ in range(users)
+        ])
+        wall = time.perf_counter() - start
+    return rec, wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10,
+                        help="utilisateurs virtuels concurrents")
+    parser.add_argument("--iterations", type=int, default=3,
+                        help="scénarios upload->archivage par utilisateur")
+    parser.add_argument("--rows", type=int, default=500,
+                        help="lignes du CSV uploadé")
+    parser.add_argument("--polls", type=int, default=3,
+                        help="appels de statut max par dataset")
+    parser.add_argument("--celery", choices=("memory", "eager"), default="memory")
+    args = parser.parse_args()
+
+    app = hermetic.setup(args.celery)
+    rec, wall = asyncio.run(run(app, args.users, args.iterations, args.rows, args.polls))
+    report(rec, wall)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Banc de charge du login (bcrypt) en environnement hermétique (cf. bench/hermetic.py).
+
+Des clients concurrents enchaînent POST /auth/login pendant que d'autres
+interrogent GET /datasets/{id}/status (endpoint sync du threadpool FastAPI):
+on mesure le débit de login et la latence du polling pendant la rafale.
+
+Usage (depuis backend/):
+    pip install -r bench/requirements.txt
+    python -m bench.login --concurrency 32 --requests 200
+    python -m bench.login --rounds 10          # coût bcrypt (défaut: BCRYPT_ROUNDS = 12)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Tuple
+
+from . import hermetic
+from .loadtest import Recorder, _csv_bytes, report
+
+PASSWORD = "bench-password"
+
+
+async def _setup_users(client: Any, users: int) -> Tuple[list, dict, str]:
+    emails = [f"login-{i}@example.com" for i in range(users)]
+    for email in emails:
+        await client.post("/users/", json={"username": email.split("@")[0],
+                                           "email": email, "password": PASSWORD})
+    res = await client.post("/auth/login", data={"username": emails[0], "password": PASSWORD})
+    auth = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    res = await client.post("/datasets/upload", headers=auth,
+                            files={"file": ("bench.csv", _csv_bytes(50), "text/csv")})
+    return emails, auth, res.json()["dataset_id"]
+
+
+async def run(app: Any, concurrency: int, requests: int, users: int,
+              pollers: int) -> Tuple[Recorder, float]:
+    import httpx  # type: ignore
+
+    rec = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=None) as client:
+        emails, auth, dataset_id = await _setup_users(client, users)
+        remaining = [requests]
+        done = asyncio.Event()
+
+        async def login_worker(n: int) -> None:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                await rec.call(client, "POST /auth/login", "POST", "/auth/login",
+                               expected=(200,),
+                               data={"username": emails[n % len(emails)], "password": PASSWORD})
+                n += concurrency
+
+        async def poller() -> None:
+            while not done.is_set():
+                await rec.call(client, "GET /datasets/{id}/status", "GET",
+                               f"/datasets/{dataset_id}/status", headers=auth)
+                await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        polls = [asyncio.create_task(poller()) for _ in range(pollers)]
+        await asyncio.gather(*[login_worker(i) for i in range(concurrency)])
+        wall = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*polls)
+    return rec, wall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="clients de login concurrents")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="nombre total de logins")
+    parser.add_argument("--users", type=int, default=8,
+                        help="comptes créés avant la mesure")
+    parser.add_argument("--pollers", type=int, default=2,
+                        help="clients de polling de statut pendant la rafale")
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="coût bcrypt (BCRYPT_ROUNDS, défaut 12)")
+    args = parser.parse_args()
+
+    if args.rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    app = hermetic.setup("memory")
+    from app.services.encrypt import bcrypt_rounds
+
+    rec, wall = asyncio.run(run(app, args.concurrency, args.requests, args.users, args.pollers))
+    print(f"bcrypt rounds: {bcrypt_rounds()}")
+    report(rec, wall)
+
+
+if __name__ == "__main__":
+    main()
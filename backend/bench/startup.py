@@ -0,0 +1,237 @@
+"""
+Benchmark de démarrage à froid (API + worker Celery).
+
+Mesure, dans des process Python neufs, le temps d'import de:
+  - api    : `app.main` (ce que charge uvicorn avant de servir)
+  - worker : `app.celery_app` + modules de tâches (ce que charge `celery worker`)
+et le temps jusqu'à la première réponse HTTP de l'API (uvicorn, startup compris)
+face à un namenode lent (--serve, nécessite bench/requirements.txt):
+  - serve  : Mongo/Redis en mémoire, WebHDFS qui répond après --namenode-delay s
+
+Usage (depuis backend/):
+    python -m bench.startup                # arbre courant
+    python -m bench.startup --ref HEAD~1   # compare avec une autre révision git
+    python -m bench.startup --top 15       # détaille les imports les plus coûteux
+    python -m bench.startup --serve        # ajoute la mesure "serve"
+
+Mesures (Python 3.11, 1 vCPU, --repeat 15, médianes; d6f7520 = avant user-032):
+    python -m bench.startup --ref d6f7520 --serve --repeat 15
+    target   d6f7520    actuel
+    api      1713 ms   1724 ms   (dans le bruit: l'API n'importait pas pyspark, seul hdfs ~80 ms est retiré)
+    worker   1148 ms   1045 ms   (-9 %: pyspark et hdfs ne sont plus importés au boot)
+    serve    7205 ms   1121 ms   (namenode à 2 s par requête: init HDFS en arrière-plan)
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+TARGETS: Dict[str, str] = {
+    "api": "import app.main",
+    "worker": (
+        "from app.celery_app import celery_app; "
+        "celery_app.loader.import_default_modules()"
+    ),
+}
+
+# Settings exige JWT_SECRET; aucune connexion n'est ouverte à l'import
+BENCH_ENV = {
+    "JWT_SECRET": "bench",
+    "MONGO_URI": "mongodb://localhost:27017/bench",
+}
+
+
+# Process API complet: patchs mémoire (cf. bench/hermetic.py, recopiés ici pour
+# mesurer aussi des révisions sans bench/), faux namenode lent, puis uvicorn.
+# Le code de l'app (startup compris) est celui de la révision mesurée.
+SERVE_STMT = """
+import http.server, json, os, sys, threading, time
+delay, port = float(sys.argv[1]), int(sys.argv[2])
+
+class SlowNamenode(http.server.BaseHTTPRequestHandler):
+    def _reply(self):
+        time.sleep(delay)
+        body = json.dumps({"boolean": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    do_GET = do_PUT = do_POST = do_DELETE = _reply
+    def log_message(self, *args):
+        pass
+
+nn = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowNamenode)
+threading.Thread(target=nn.serve_forever, daemon=True).start()
+os.environ.update({"HADOOP_HOST": "127.0.0.1", "HADOOP_PORT": str(nn.server_address[1]),
+                   "REDIS_URL": "redis://localhost:6379/0"})
+
+import fakeredis, mongomock, pymongo, redis
+shared = mongomock.MongoClient(os.environ["MONGO_URI"])
+pymongo.MongoClient = lambda *a, **k: shared
+server = fakeredis.FakeServer()
+class SharedFakeRedis(fakeredis.FakeRedis):
+    def __init__(self, *a, **k):
+        k["server"] = server
+        super().__init__(*a, **k)
+    @classmethod
+    def from_url(cls, *a, **k):
+        return cls()
+redis.Redis = SharedFakeRedis
+
+import uvicorn
+from app.main import app
+uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve_once(cwd: str, namenode_delay: float, deadline: float = 120.0) -> float:
+    """Lance l'API et renvoie le délai jusqu'à la première réponse HTTP (s)."""
+    env = {**os.environ, **BENCH_ENV, "PYTHONDONTWRITEBYTECODE": "1"}
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", SERVE_STMT, str(namenode_delay), str(port)],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        while time.perf_counter() - start < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"l'API s'est arrêtée:\n{proc.stderr.read().decode()[-2000:]}")
+            try:
+                # /docs: route statique, ne dépend d'aucun service externe
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/docs", timeout=0.5):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError(f"pas de réponse HTTP après {deadline:.0f} s")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _run_once(cwd: str, stmt: str, importtime: bool = False) -> Tuple[float, str]:
+    env = {**os.environ, **BENCH_ENV, "PYTHONDONTWRITEBYTECODE": "1"}
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", stmt]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, env=env,
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{stmt!r} a échoué:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+def _top_imports(importtime_log: str, top: int) -> List[Tuple[int, str]]:
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumul_us, name = line[len("import time:"):].split("|")
+        # modules de premier niveau uniquement (pas d'indentation)
+        name = name[1:]
+        if not name.startswith(" "):
+            rows.append((int(cumul_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def _summary(times: List[float]) -> Dict[str, float]:
+    return {"median_s": statistics.median(times), "min_s": min(times), "max_s": max(times)}
+
+
+def measure(dirs: Dict[str, str], repeat: int, top: int,
+            namenode_delay: float | None = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Mesure chaque arbre de `dirs` (libellé -> dossier backend). Les arbres sont
+    alternés à chaque répétition pour que la dérive de la machine (fréquence CPU,
+    cache disque) ne biaise pas la comparaison.
+    """
+    times: Dict[str, Dict[str, List[float]]] = {label: {} for label in dirs}
+    for target, stmt in TARGETS.items():
+        for cwd in dirs.values():
+            _run_once(cwd, stmt)  # échauffement (cache disque, .pyc)
+        for _ in range(repeat):
+            for label, cwd in dirs.items():
+                times[label].setdefault(target, []).append(_run_once(cwd, stmt)[0])
+        if top:
+            for cwd in dirs.values():
+                _, log = _run_once(cwd, stmt, importtime=True)
+                print(f"\n[{cwd}] {target}: imports les plus coûteux")
+                for us, name in _top_imports(log, top):
+                    print(f"  {us / 1000:9.1f} ms  {name}")
+    if namenode_delay is not None:
+        for _ in range(repeat):
+            for label, cwd in dirs.items():
+                times[label].setdefault("serve", []).append(_serve_once(cwd, namenode_delay))
+    return {label: {target: _summary(t) for target, t in by_target.items()}
+            for label, by_target in times.items()}
+
+
+def _export_ref(ref: str, dest: str) -> str:
+    """Extrait backend/app d'une révision git dans `dest`; renvoie le dossier backend."""
+    archive = os.path.join(dest, "ref.tar")
+    root = subprocess.run(["git", "rev-parse", "--show-toplevel"], check=True,
+                          capture_output=True, text=True).stdout.strip()
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "-C", root, "archive", ref, "--", "backend/app"],
+                       check=True, stdout=f)
+    with tarfile.open(archive) as tar:
+        tar.extractall(dest)
+    return os.path.join(dest, "backend")
+
+
+def _print(label: str, results: Dict[str, Dict[str, float]]) -> None:
+    for target, r in results.items():
+        print(f"{label:>10} {target:<7} median={r['median_s'] * 1000:8.1f} ms  "
+              f"min={r['min_s'] * 1000:8.1f} ms  max={r['max_s'] * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ref", help="révision git de comparaison")
+    parser.add_argument("--top", type=int, default=0,
+                        help="afficher les N imports les plus coûteux")
+    parser.add_argument("--serve", action="store_true",
+                        help="mesurer aussi le délai jusqu'à la première réponse HTTP")
+    parser.add_argument("--namenode-delay", type=float, default=2.0,
+                        help="latence (s) de chaque requête au faux namenode (--serve)")
+    args = parser.parse_args()
+
+    delay = args.namenode_delay if args.serve else None
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {"current": backend_dir}
+        if args.ref:
+            dirs[args.ref] = _export_ref(args.ref, tmp)
+        results = measure(dirs, args.repeat, args.top, delay)
+
+    print()
+    for label, res in results.items():
+        _print(label, res)
+    if args.ref:
+        current, baseline = results["current"], results[args.ref]
+        for target in current:
+            gain = baseline[target]["median_s"] - current[target]["median_s"]
+            print(f"{'gain':>10} {target:<7} {gain * 1000:+8.1f} ms")
+
+if __name__ == "__main__":
+    main()
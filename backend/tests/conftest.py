@@ -0,0 +1,53 @@
+"""
+Tests en environnement hermétique (mongomock, fakeredis, faux WebHDFS), cf.
+bench/hermetic.py. L'environnement est préparé ici, avant l'import des modules
+de test: `app.config` lit ses variables d'environnement à l'import.
+
+Usage (depuis backend/):
+    pip install -r tests/requirements.txt
+    python -m pytest -q
+"""
+import os
+
+import pytest  # type: ignore
+
+# bcrypt au coût minimal: les tests créent des comptes
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from bench import hermetic  # noqa: E402
+
+APP = hermetic.setup("memory")
+
+
+@pytest.fixture(autouse=True)
+def _clean_state():
+    """Base Mongo et Redis vides pour chaque test."""
+    from app import db
+    from app.services.cache import get_redis
+
+    # (delete_many plutôt que drop: les index uniques de _init_backend restent)
+    for name in db.list_collection_names():
+        db[name].delete_many({})
+    get_redis().flushall()
+    yield
+
+
+@pytest.fixture
+def app():
+    return APP
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient  # type: ignore
+
+    # hors `with`: pas d'événement startup (init déjà faite par hermetic.setup)
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth(client):
+    """En-têtes d'un utilisateur créé pour le test (premier compte: admin)."""
+    from tests.helpers import login
+
+    return login(client, "tests@example.com")
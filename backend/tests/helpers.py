@@ -0,0 +1,33 @@
+"""Fonctions communes aux tests (datasets créés via l'API)."""
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId  # type: ignore
+
+
+def upload_csv(client, auth: Dict[str, str], content: bytes = b"a,b\n1,2\n3,4\n",
+               filename: str = "data.csv") -> str:
+    """Upload via POST /datasets/upload (tâche mise en file sans worker)."""
+    res = client.post("/datasets/upload", headers=auth,
+                      files={"file": (filename, content, "text/csv")})
+    assert res.status_code == 200, res.text
+    return res.json()["dataset_id"]
+
+
+def set_status(dataset_id: str, status: str, **extra: Any) -> None:
+    from app import db
+
+    db.datasets_infos.update_one(
+        {"_id": ObjectId(dataset_id)},
+        {"$set": {"status": status, "updated_at": datetime.utcnow(), **extra}},
+    )
+
+
+def login(client, email: str, password: str = "tests-password") -> Dict[str, str]:
+    """Crée le compte (le premier créé est admin) et renvoie ses en-têtes."""
+    res = client.post("/users/", json={"username": email.split("@")[0], "email": email,
+                                       "password": password})
+    assert res.status_code == 200, res.text
+    res = client.post("/auth/login", data={"username": email, "password": password})
+    assert res.status_code == 200, res.text
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
@@ -0,0 +1,86 @@
+"""Cache du détail (GET /datasets/{id}): génération par dataset et invalidation."""
+from app.services import cache
+from app.tasks.datasets_task import purge_datasets_task
+
+from .helpers import set_status, upload_csv
+
+USER = "u1"
+DATASET = "d1"
+
+
+def test_set_then_get_returns_entry():
+    generation = cache.detail_generation(DATASET)
+    cache.set_cached_detail(USER, DATASET, generation, b"{}", '"e1"')
+
+    cached, current = cache.get_cached_detail(USER, DATASET)
+
+    assert cached == (b"{}", '"e1"')
+    assert current == generation == 0
+
+
+def test_invalidate_bumps_generation_and_drops_entry():
+    cache.set_cached_detail(USER, DATASET, 0, b"{}", '"e1"')
+
+    cache.invalidate_details(USER, [DATASET])
+
+    cached, generation = cache.get_cached_detail(USER, DATASET)
+    assert cached is None
+    assert generation == 1
+    assert cache.get_redis().ttl(cache._generation_key(DATASET)) > 0
+
+
+def test_stale_write_after_invalidation_is_never_served():
+    # Lecteur: génération lue avant Mongo, puis archivage concurrent
+    generation = cache.detail_generation(DATASET)
+    cache.invalidate_details(USER, [DATASET])
+    # ... le lecteur écrit ensuite le détail chargé avant l'archivage
+    cache.set_cached_detail(USER, DATASET, generation, b"{}", '"stale"')
+
+    cached, _ = cache.get_cached_detail(USER, DATASET)
+    assert cached is None
+
+
+def test_no_write_without_redis_generation():
+    cache.set_cached_detail(USER, DATASET, None, b"{}", '"e1"')
+
+    assert not cache.get_redis().exists(cache._detail_key(USER, DATASET))
+
+
+def test_cache_dataset_detail_skips_running_statuses():
+    cache.cache_dataset_detail(USER, {"id": DATASET, "status": "analyzing"}, 0)
+    assert cache.get_cached_detail(USER, DATASET)[0] is None
+
+    cache.cache_dataset_detail(USER, {"id": DATASET, "status": "done"}, 0)
+    assert cache.get_cached_detail(USER, DATASET)[0] is not None
+
+
+def test_get_dataset_etag_and_archive_invalidation(client, auth):
+    dataset_id = upload_csv(client, auth)
+    set_status(dataset_id, "done", row_count=3)
+
+    first = client.get(f"/datasets/{dataset_id}", headers=auth)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    user_id = client.get("/auth/me", headers=auth).json()["id"]
+    assert cache.get_cached_detail(user_id, dataset_id)[0] == (first.content, etag)
+
+    # servi depuis le cache (même ETag), 304 si le client l'a déjà
+    res = client.get(f"/datasets/{dataset_id}", headers={**auth, "If-None-Match": etag})
+    assert res.status_code == 304
+
+    assert client.delete(f"/datasets/{dataset_id}", headers=auth).status_code == 200
+    assert client.get(f"/datasets/{dataset_id}", headers=auth).status_code == 404
+
+
+def test_purge_invalidates_cached_detail(client, auth):
+    dataset_id = upload_csv(client, auth)
+    set_status(dataset_id, "done")
+    user_id = client.get("/auth/me", headers=auth).json()["id"]
+    cache.set_cached_detail(user_id, dataset_id, cache.detail_generation(dataset_id),
+                            b"{}", '"e1"')
+
+    result = purge_datasets_task.apply(
+        kwargs={"user_id": user_id, "dataset_ids": [dataset_id]}).get()
+
+    assert result == {"purged": [dataset_id], "rescheduled": []}
+    assert cache.get_cached_detail(user_id, dataset_id)[0] is None
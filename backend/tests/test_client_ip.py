@@ -0,0 +1,67 @@
+"""IP client derrière des reverse proxys de confiance (X-Forwarded-For)."""
+import pytest  # type: ignore
+from starlette.requests import Request  # type: ignore
+
+from app.config import settings
+from app.services import client_ip as client_ip_module
+from app.services.client_ip import client_ip
+
+
+@pytest.fixture(autouse=True)
+def trusted(monkeypatch):
+    monkeypatch.setattr(settings, "trusted_proxies_csv", "172.28.0.10, 10.1.0.0/16")
+    client_ip_module._trusted_networks.cache_clear()
+    yield
+    client_ip_module._trusted_networks.cache_clear()
+
+
+def request(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded is not None else []
+    return Request({"type": "http", "headers": headers,
+                    "client": (peer, 50000) if peer else None})
+
+
+def test_direct_client_header_is_ignored():
+    assert client_ip(request("203.0.113.7", "198.51.100.1")) == "203.0.113.7"
+
+
+def test_trusted_proxy_forwards_client():
+    assert client_ip(request("172.28.0.10", "203.0.113.7")) == "203.0.113.7"
+
+
+def test_chain_is_walked_from_the_right():
+    # l'entrée la plus à gauche est forgée par le client
+    chain = "1.2.3.4, 203.0.113.7, 10.1.2.3"
+    assert client_ip(request("172.28.0.10", chain)) == "203.0.113.7"
+
+
+def test_spaces_and_empty_entries():
+    assert client_ip(request("172.28.0.10", " , 203.0.113.7 ,,")) == "203.0.113.7"
+
+
+def test_invalid_entry_is_not_trusted():
+    assert client_ip(request("172.28.0.10", "203.0.113.7, garbage")) == "garbage"
+
+
+def test_only_proxies_in_chain():
+    assert client_ip(request("172.28.0.10", "10.1.0.5, 10.1.0.6")) == "10.1.0.5"
+
+
+def test_trusted_proxy_without_header():
+    assert client_ip(request("172.28.0.10")) == "172.28.0.10"
+
+
+def test_unlisted_neighbour_is_not_trusted():
+    # même sous-réseau Docker que le proxy, mais pas le proxy lui-même
+    assert client_ip(request("172.28.0.1", "198.51.100.1")) == "172.28.0.1"
+
+
+def test_no_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "trusted_proxies_csv", "")
+    client_ip_module._trusted_networks.cache_clear()
+
+    assert client_ip(request("172.28.0.10", "198.51.100.1")) == "172.28.0.10"
+
+
+def test_unknown_peer():
+    assert client_ip(request(None, "198.51.100.1")) == "unknown"
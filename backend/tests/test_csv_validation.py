@@ -0,0 +1,165 @@
+"""Validation structurelle des CSV (encodage, séparateur, nb de champs, guillemets)."""
+import csv
+import io
+import random
+
+import pytest  # type: ignore
+
+from app.services import csv_validation
+from app.services.csv_validation import validate_csv
+
+
+@pytest.fixture
+def validate(tmp_path):
+    def run(data: bytes):
+        path = tmp_path / "data.csv"
+        path.write_bytes(data)
+        return validate_csv(str(path))
+    return run
+
+
+def _lines(report):
+    return [e["line"] for e in report["errors"]]
+
+
+def test_valid_file(validate):
+    report = validate(b"a,b,c\n1,2,3\n4,5,6\n")
+
+    assert report == {"row_count": 3, "delimiter": ",", "encoding": "utf-8",
+                      "column_count": 3, "errors": []}
+
+
+def test_row_count_without_trailing_newline(validate):
+    assert validate(b"a,b\n1,2")["row_count"] == 2
+
+
+def test_empty_file(validate):
+    report = validate(b"\n  \n")
+    assert report["errors"] == [{"line": 1, "message": "Fichier vide"}]
+
+
+def test_delimiter_ignores_quoted_commas(validate):
+    report = validate(b'"nom, prenom";ville;age\n"Doe, John";Paris;42\n')
+
+    assert report["delimiter"] == ";"
+    assert report["column_count"] == 3
+    assert report["errors"] == []
+
+
+def test_wrong_field_counts_are_reported_per_line(validate):
+    report = validate(b"a,b\n1,2\n1,2,3\n4\n5,6\n")
+
+    assert report["errors"] == [
+        {"line": 3, "message": "Nombre de champs incorrect", "expected": 2, "found": 3},
+        {"line": 4, "message": "Nombre de champs incorrect", "expected": 2, "found": 1},
+    ]
+
+
+def test_blank_lines_and_crlf_are_ignored(validate):
+    report = validate(b"a,b\r\n1,2\r\n\r\n\n3,4\r\n")
+
+    assert report["errors"] == []
+    assert report["row_count"] == 5
+
+
+def test_quoted_header_keeps_checking_unquoted_rows(validate):
+    report = validate(b'"a","b"\n1,2\n1,2,3\n')
+
+    assert _lines(report) == [3]
+
+
+def test_newline_inside_quoted_field(validate):
+    report = validate(b'a,b\n"multi\nline, text",2\n3,4\n5\n')
+
+    assert _lines(report) == [5]
+    assert report["row_count"] == 5
+
+
+def test_quoted_field_across_blocks(validate, monkeypatch):
+    monkeypatch.setattr(csv_validation, "CHUNK_SIZE", 8)
+    data = b'a,b\n"' + b"x\n" * 20 + b'",2\n3,4\n5\n'
+
+    report = validate(data)
+
+    assert _lines(report) == [24]
+
+
+def test_malformed_quote_does_not_stop_validation(validate):
+    report = validate(b'a,b\n"x"y,2\n1,2,3\n')
+
+    assert report["errors"][0]["line"] == 2
+    assert report["errors"][0]["message"].startswith("Guillemets mal formés")
+    assert _lines(report)[1:] == [3]
+
+
+def test_unterminated_quote(validate):
+    report = validate(b'a,b\n1,2\n"open,3\n4,5\n')
+
+    assert report["errors"] == [
+        {"line": 3, "message": "Guillemets mal formés: champ quoté non terminé"}]
+
+
+def test_utf8_bom(validate):
+    report = validate(b'\xef\xbb\xbf"a",b\n1,2\n')
+
+    assert report["encoding"] == "utf-8-sig"
+    assert report["column_count"] == 2
+    assert report["errors"] == []
+
+
+def test_multibyte_character_across_blocks_stays_utf8(validate, monkeypatch):
+    monkeypatch.setattr(csv_validation, "CHUNK_SIZE", 5)
+
+    assert validate("a,b\né,è\n".encode("utf-8"))["encoding"] == "utf-8"
+
+
+@pytest.mark.parametrize("data, encoding", [
+    (b"nom,prix\ncaf\xe9,5\x80\n", "cp1252"),
+    (b"nom,code\nx,\x81\n", "iso-8859-1"),
+    # séquence UTF-8 tronquée en fin de fichier
+    (b"a,b\n1,\xc3", "cp1252"),
+])
+def test_fallback_encodings(validate, data, encoding):
+    report = validate(data)
+
+    assert report["encoding"] == encoding
+    assert report["errors"] == []
+
+
+def test_errors_are_capped(validate):
+    report = validate(b"a,b\n" + b"1\n" * (csv_validation.MAX_ERRORS + 10))
+
+    assert len(report["errors"]) == csv_validation.MAX_ERRORS
+
+
+def _random_csv(rng: random.Random) -> bytes:
+    values = ["x", "1", "", "a,b", 'say "hi"', "two\nlines", "\n"]
+    rows = [["h1", "h2", "h3"]]
+    for _ in range(rng.randint(1, 30)):
+        rows.append([rng.choice(values) for _ in range(rng.choice([3, 3, 3, 2, 4]))])
+    out = io.StringIO(newline="")
+    csv.writer(out, lineterminator="\n",
+               quoting=rng.choice([csv.QUOTE_MINIMAL, csv.QUOTE_ALL])).writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+def _reference_error_lines(data: bytes):
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""), strict=True)
+    lines, start = [], 1
+    for row in reader:
+        if start > 1 and len(row) != 3:
+            lines.append(start)
+        start = reader.line_num + 1
+    return lines
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_full_csv_parse(validate, monkeypatch, seed):
+    rng = random.Random(seed)
+    # (blocs minuscules, mais l'en-tête tient dans le premier)
+    monkeypatch.setattr(csv_validation, "CHUNK_SIZE", rng.choice([16, 17, 64, 1024]))
+    data = _random_csv(rng)
+
+    report = validate(data)
+
+    assert _lines(report) == _reference_error_lines(data)[:csv_validation.MAX_ERRORS]
@@ -0,0 +1,78 @@
+"""Téléchargement du CSV brut: en-tête Range et raw.csv absent de HDFS."""
+import pytest  # type: ignore
+from fastapi import HTTPException  # type: ignore
+
+from app.controllers.datasets_controller import _content_disposition, _parse_range
+from app.services.hdfs_client import get_hdfs_client
+
+from .helpers import set_status, upload_csv
+
+CONTENT = b"a,b\n" + b"".join(b"%d,%d\n" % (i, i * i) for i in range(100))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-9,20-29", None),      # multi-plages: fichier entier
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-500", (90, 99)),     # fin bornée à la taille
+    ("bytes=-10", (90, 99)),        # suffixe
+    ("bytes=-500", (0, 99)),
+    (" bytes=5-5 ", (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=-", "bytes=a-b", "items=0-9", "bytes=100-", "bytes=10-5", "bytes=-0",
+])
+def test_parse_range_invalid(header):
+    with pytest.raises(HTTPException) as exc:
+        _parse_range(header, 100)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == "bytes */100"
+
+
+def test_content_disposition_ascii_fallback():
+    value = _content_disposition('données "2024".csv')
+    assert value == ('attachment; filename="donn_es _2024_.csv"; '
+                     "filename*=UTF-8''donn%C3%A9es%20%222024%22.csv")
+
+
+def _stored_dataset(client, auth, status="done"):
+    dataset_id = upload_csv(client, auth)
+    user_id = client.get("/auth/me", headers=auth).json()["id"]
+    hdfs_path = f"/user_datasets/{user_id}/{dataset_id}/raw.csv"
+    set_status(dataset_id, status, hdfs_path=hdfs_path)
+    return dataset_id, hdfs_path
+
+
+def test_download_full_and_range(client, auth):
+    dataset_id, hdfs_path = _stored_dataset(client, auth)
+    get_hdfs_client().write(hdfs_path, data=CONTENT, overwrite=True)
+
+    res = client.get(f"/datasets/{dataset_id}/download", headers=auth)
+    assert res.status_code == 200
+    assert res.content == CONTENT
+    assert res.headers["Accept-Ranges"] == "bytes"
+
+    res = client.get(f"/datasets/{dataset_id}/download",
+                     headers={**auth, "Range": "bytes=4-11"})
+    assert res.status_code == 206
+    assert res.content == CONTENT[4:12]
+    assert res.headers["Content-Range"] == f"bytes 4-11/{len(CONTENT)}"
+
+    res = client.get(f"/datasets/{dataset_id}/download",
+                     headers={**auth, "Range": f"bytes={len(CONTENT)}-"})
+    assert res.status_code == 416
+
+
+@pytest.mark.parametrize("status, code", [("done", 404), ("uploading_hdfs", 409)])
+def test_download_missing_raw_csv(client, auth, status, code):
+    dataset_id, _ = _stored_dataset(client, auth, status)
+
+    res = client.get(f"/datasets/{dataset_id}/download", headers=auth)
+
+    assert res.status_code == code
@@ -0,0 +1,173 @@
+"""process_csv_task: reprise depuis les checkpoints ou échec définitif."""
+import os
+
+import pytest  # type: ignore
+from bson import ObjectId  # type: ignore
+from hdfs.util import HdfsError  # type: ignore
+from pymongo.errors import ConnectionFailure  # type: ignore
+
+from app import db
+from app.services.spark import spark_analyze
+from app.tasks import datasets_task
+from app.tasks.datasets_task import process_csv_task
+
+from .helpers import upload_csv
+
+CONTENT = b"a,b\n1,2\n3,4\n"
+
+
+class FakeAnalysis:
+    """Remplace analyze_csv_local; lève tour à tour les erreurs de `failures`."""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.calls = []
+
+    def __call__(self, path, sep=",", encoding="utf-8", should_cancel=None):
+        with open(path, "rb") as f:
+            self.calls.append(f.read())
+        if self.failures:
+            raise self.failures.pop(0)
+        return {"row_count": 2, "column_count": 2,
+                "schema": [{"name": "a", "type": "int"}, {"name": "b", "type": "int"}],
+                "null_counts": {"a": 0, "b": 0}}
+
+
+@pytest.fixture
+def task_kwargs(client, auth):
+    """Dataset uploadé (queued) et arguments de la tâche envoyée par l'API."""
+    dataset_id = upload_csv(client, auth, CONTENT)
+    info = db.datasets_infos.find_one({"_id": ObjectId(dataset_id)})
+    return {"dataset_id": dataset_id, "user_id": str(info["user_id"]),
+            "local_path": info["local_path"], "filename": "data.csv"}
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    calls = []
+    real = datasets_task.upload_file
+
+    def upload_file(hdfs_path, local_path, **kwargs):
+        calls.append(hdfs_path)
+        return real(hdfs_path, local_path, **kwargs)
+
+    monkeypatch.setattr(datasets_task, "upload_file", upload_file)
+    return calls
+
+
+def _run(monkeypatch, kwargs, analysis):
+    monkeypatch.setattr(spark_analyze, "analyze_csv_local", analysis)
+    return process_csv_task.apply(kwargs=kwargs)
+
+
+def _info(kwargs):
+    return db.datasets_infos.find_one({"_id": ObjectId(kwargs["dataset_id"])})
+
+
+def test_success(monkeypatch, task_kwargs, uploads):
+    analysis = FakeAnalysis()
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.successful()
+    info = _info(task_kwargs)
+    assert info["status"] == "done"
+    assert info["row_count"] == 2
+    assert set(info["checkpoints"]) == {"hdfs_dir", "uploaded", "analyzed", "persisted"}
+    assert len(uploads) == 1
+    assert not os.path.exists(task_kwargs["local_path"])
+
+
+def test_transient_error_resumes_after_upload(monkeypatch, task_kwargs, uploads):
+    analysis = FakeAnalysis(HdfsError("namenode injoignable"))
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.successful()
+    info = _info(task_kwargs)
+    assert info["status"] == "done"
+    assert info["retry_count"] == 1
+    assert info["last_error"] == "namenode injoignable"
+    # raw.csv déjà sur HDFS: pas de second upload, seule l'analyse est rejouée
+    assert len(uploads) == 1
+    assert analysis.calls == [CONTENT, CONTENT]
+
+
+def test_resume_reads_raw_csv_back_from_hdfs(monkeypatch, task_kwargs, uploads):
+    class LosesLocalFile(FakeAnalysis):
+        def __call__(self, path, **kwargs):
+            if not self.calls:
+                os.remove(path)
+                self.calls.append(None)
+                raise ConnectionFailure("mongo injoignable")
+            return super().__call__(path, **kwargs)
+
+    analysis = LosesLocalFile()
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.successful()
+    assert analysis.calls == [None, CONTENT]
+    assert len(uploads) == 1
+
+
+def test_resume_reuses_stored_analysis(monkeypatch, task_kwargs):
+    saves = []
+    real = datasets_task.save_analysis
+
+    def save_analysis(database, base_doc, analysis):
+        saves.append(analysis)
+        if len(saves) == 1:
+            raise ConnectionFailure("mongo injoignable")
+        return real(database, base_doc, analysis)
+
+    monkeypatch.setattr(datasets_task, "save_analysis", save_analysis)
+    analysis = FakeAnalysis()
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.successful()
+    # 2e tentative: analyse relue depuis analysis.json, Spark non relancé
+    assert len(analysis.calls) == 1
+    assert saves[0] == saves[1]
+    assert _info(task_kwargs)["status"] == "done"
+
+
+def test_deterministic_error_fails_without_retry(monkeypatch, task_kwargs):
+    analysis = FakeAnalysis(ValueError("colonne illisible"))
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.failed()
+    info = _info(task_kwargs)
+    assert info["status"] == "failed"
+    assert info["error_message"] == "colonne illisible"
+    assert "retry_count" not in info
+    assert len(analysis.calls) == 1
+    assert not os.path.exists(task_kwargs["local_path"])
+
+
+def test_transient_errors_exhaust_retries(monkeypatch, task_kwargs):
+    retries = process_csv_task.max_retries
+    analysis = FakeAnalysis(*[HdfsError("namenode injoignable")] * (retries + 1))
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.failed()
+    info = _info(task_kwargs)
+    assert info["status"] == "failed"
+    assert info["retry_count"] == retries
+    assert len(analysis.calls) == retries + 1
+    assert not os.path.exists(task_kwargs["local_path"])
+
+
+def test_cancelled_before_start(monkeypatch, task_kwargs):
+    db.datasets_infos.update_one({"_id": ObjectId(task_kwargs["dataset_id"])},
+                                 {"$set": {"cancel_requested": True}})
+    analysis = FakeAnalysis()
+
+    result = _run(monkeypatch, task_kwargs, analysis)
+
+    assert result.get() == {"dataset_id": task_kwargs["dataset_id"], "cancelled": True}
+    assert _info(task_kwargs)["status"] == "queued"
+    assert analysis.calls == []
@@ -0,0 +1,112 @@
+"""purge_datasets_task: datasets en cours replanifiés, erreurs HDFS relancées."""
+import pytest  # type: ignore
+from bson import ObjectId  # type: ignore
+from hdfs.util import HdfsError  # type: ignore
+
+from app import db
+from app.tasks import datasets_task
+from app.tasks.datasets_task import purge_datasets_task
+
+from .helpers import set_status, upload_csv
+
+
+class FakeAdmin:
+    """Client HDFS admin dont delete() lève tour à tour les erreurs de `failures`."""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.deleted = []
+
+    def delete(self, path, recursive=False):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.deleted.append(path)
+        return True
+
+
+@pytest.fixture
+def archived(client, auth):
+    """Deux datasets archivés (done) et l'id de leur propriétaire."""
+    ids = [upload_csv(client, auth) for _ in range(2)]
+    for dataset_id in ids:
+        set_status(dataset_id, "done")
+        assert client.delete(f"/datasets/{dataset_id}", headers=auth).status_code == 200
+    return client.get("/auth/me", headers=auth).json()["id"], ids
+
+
+@pytest.fixture
+def rescheduled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(purge_datasets_task, "apply_async",
+                        lambda **options: calls.append(options))
+    return calls
+
+
+def _purge(monkeypatch, admin, user_id, ids):
+    monkeypatch.setattr(datasets_task, "get_hdfs_client_as", lambda user: admin)
+    return purge_datasets_task.apply(kwargs={"user_id": user_id, "dataset_ids": ids})
+
+
+def _remaining(ids):
+    return db.datasets_infos.count_documents({"_id": {"$in": [ObjectId(i) for i in ids]}})
+
+
+def test_purge_deletes_hdfs_and_mongo(monkeypatch, archived, rescheduled):
+    user_id, ids = archived
+    admin = FakeAdmin()
+
+    result = _purge(monkeypatch, admin, user_id, ids)
+
+    assert result.get() == {"purged": ids, "rescheduled": []}
+    assert len(admin.deleted) == 2
+    assert _remaining(ids) == 0
+    assert rescheduled == []
+
+
+def test_running_dataset_is_rescheduled(monkeypatch, archived, rescheduled):
+    user_id, (running, done) = archived
+    set_status(running, "analyzing")
+
+    result = _purge(monkeypatch, FakeAdmin(), user_id, [running, done])
+
+    assert result.get() == {"purged": [done], "rescheduled": [running]}
+    assert _remaining([running]) == 1
+    assert rescheduled == [{
+        "kwargs": {"user_id": user_id, "dataset_ids": [running]},
+        "countdown": datasets_task.settings.purge_running_recheck_seconds,
+    }]
+
+
+def test_hdfs_error_is_retried(monkeypatch, archived, rescheduled):
+    user_id, ids = archived
+    admin = FakeAdmin(HdfsError("namenode injoignable"))
+
+    result = _purge(monkeypatch, admin, user_id, ids)
+
+    assert result.successful()
+    assert len(admin.deleted) == 2
+    assert _remaining(ids) == 0
+
+
+def test_hdfs_error_after_max_retries(monkeypatch, archived, rescheduled):
+    user_id, ids = archived
+    retries = purge_datasets_task.max_retries
+    admin = FakeAdmin(*[HdfsError("namenode injoignable")] * (retries + 1))
+
+    result = _purge(monkeypatch, admin, user_id, ids[:1])
+
+    assert result.failed()
+    assert admin.failures == []
+    assert db.datasets_infos.find_one({"_id": ObjectId(ids[0])})["purge_error"]
+
+
+def test_unexpected_error_is_not_retried(monkeypatch, archived, rescheduled):
+    user_id, ids = archived
+    admin = FakeAdmin(ValueError("bug"), ValueError("bug"))
+
+    result = _purge(monkeypatch, admin, user_id, ids)
+
+    assert result.failed()
+    assert isinstance(result.result, ValueError)
+    assert len(admin.failures) == 1
+    assert _remaining(ids) == 2
@@ -0,0 +1,92 @@
+"""DSL des requêtes ad-hoc: validation contre le schéma, élagage, hash canonique."""
+import pytest  # type: ignore
+
+from app.services.query_dsl import DatasetQuery, query_hash, required_columns, validate_query
+
+COLUMNS = ["ville", "age", "salaire", "prix.ht"]
+
+
+def q(**kwargs) -> DatasetQuery:
+    return DatasetQuery.model_validate(kwargs)
+
+
+def test_valid_aggregation_query():
+    query = q(select=["ville"], where=[{"column": "age", "op": ">=", "value": 18}],
+              group_by=["ville"],
+              aggregations=[{"fn": "avg", "column": "salaire", "alias": "moyenne"},
+                            {"fn": "count"}],
+              order_by=[{"column": "moyenne", "desc": True}, {"column": "count_all"}])
+
+    validate_query(query, COLUMNS)
+
+
+@pytest.mark.parametrize("query, message", [
+    (q(select=["inconnue"]), "Colonne inconnue dans select: inconnue"),
+    (q(where=[{"column": "x", "op": "=", "value": 1}]), "Colonne inconnue dans where: x"),
+    (q(where=[{"column": "age", "op": "in", "value": 18}]), "'in' attend une liste pour age"),
+    (q(where=[{"column": "age", "op": ">"}]), "Valeur manquante pour age >"),
+    (q(aggregations=[{"fn": "sum"}]), "'sum' nécessite une colonne"),
+    (q(aggregations=[{"fn": "max", "column": "x"}]), "Colonne inconnue dans aggregations: x"),
+    (q(select=["ville", "age"], group_by=["ville"]),
+     "Avec une agrégation, select ne peut contenir que des colonnes de group_by: age"),
+    (q(select=["ville"], order_by=[{"column": "age"}]),
+     "order_by sur une colonne absente du résultat: age"),
+    (q(group_by=["ville"], order_by=[{"column": "salaire"}]),
+     "order_by sur une colonne absente du résultat: salaire"),
+])
+def test_invalid_queries(query, message):
+    with pytest.raises(ValueError) as exc:
+        validate_query(query, COLUMNS)
+    assert str(exc.value) == message
+
+
+def test_null_filters_need_no_value():
+    validate_query(q(where=[{"column": "age", "op": "is_null"}]), COLUMNS)
+
+
+def test_order_by_any_column_without_select():
+    validate_query(q(order_by=[{"column": "prix.ht"}]), COLUMNS)
+
+
+def test_required_columns_prunes_in_schema_order():
+    query = q(select=["salaire", "ville"], where=[{"column": "prix.ht", "op": "=", "value": 1}])
+
+    assert required_columns(query, COLUMNS) == ["ville", "salaire", "prix.ht"]
+
+
+def test_required_columns_counts_aggregations_and_orders():
+    query = q(group_by=["ville"], aggregations=[{"fn": "count"}, {"fn": "sum", "column": "age"}],
+              order_by=[{"column": "count_all"}])
+
+    assert required_columns(query, COLUMNS) == ["ville", "age"]
+
+
+def test_required_columns_without_projection_reads_everything():
+    query = q(where=[{"column": "age", "op": ">", "value": 1}], order_by=[{"column": "ville"}])
+
+    assert required_columns(query, COLUMNS) == COLUMNS
+
+
+def test_output_name_defaults():
+    assert q(aggregations=[{"fn": "count"}]).aggregations[0].output_name == "count_all"
+    assert q(aggregations=[{"fn": "avg", "column": "age"}]).aggregations[0].output_name == "avg_age"
+
+
+def test_query_hash_ignores_key_order_and_defaults():
+    a = DatasetQuery.model_validate_json(
+        '{"select": ["ville"], "limit": 10, "where": [{"value": 3, "op": ">", "column": "age"}]}')
+    b = DatasetQuery.model_validate_json(
+        '{"where": [{"column": "age", "op": ">", "value": 3}], "limit": 10, "select": ["ville"],'
+        ' "group_by": []}')
+
+    assert query_hash(a) == query_hash(b)
+    assert len(query_hash(a)) == 32
+
+
+def test_query_hash_depends_on_content():
+    base = query_hash(q(select=["ville"], limit=10))
+
+    assert query_hash(q(select=["ville"], limit=11)) != base
+    assert query_hash(q(select=["age"], limit=10)) != base
+    assert query_hash(q(select=["ville"], order_by=[{"column": "ville", "desc": True}],
+                        limit=10)) != base
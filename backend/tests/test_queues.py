@@ -0,0 +1,39 @@
+"""Quota de datasets en cours par utilisateur et endpoint /queues."""
+from app.config import settings
+
+from .helpers import login, set_status, upload_csv
+
+
+def test_inflight_quota(client, auth, monkeypatch):
+    monkeypatch.setattr(settings, "max_inflight_datasets_per_user", 1)
+    first = upload_csv(client, auth)
+
+    res = client.post("/datasets/upload", headers=auth,
+                      files={"file": ("data.csv", b"a,b\n1,2\n", "text/csv")})
+    assert res.status_code == 429
+
+    set_status(first, "done")
+    upload_csv(client, auth)
+
+
+def test_archived_dataset_leaves_the_quota(client, auth, monkeypatch):
+    monkeypatch.setattr(settings, "max_inflight_datasets_per_user", 1)
+    stuck = upload_csv(client, auth)
+    # worker perdu: le dataset reste "analyzing" même après archivage
+    set_status(stuck, "analyzing")
+    assert client.delete(f"/datasets/{stuck}", headers=auth).status_code == 200
+
+    upload_csv(client, auth)
+
+
+def test_queues_is_admin_only(client, auth):
+    user = login(client, "user@example.com")
+
+    assert client.get("/queues").status_code == 401
+    assert client.get("/queues", headers=user).status_code == 403
+
+    upload_csv(client, auth)
+    res = client.get("/queues", headers=auth)
+    assert res.status_code == 200
+    queued = sum(q["queued"] for q in res.json()["queues"].values())
+    assert queued == 1
@@ -0,0 +1,71 @@
+"""Compteurs d'usage par utilisateur: idempotence, archivage, backfill."""
+from bson import ObjectId  # type: ignore
+
+from app import db
+from app.services.user_stats import backfill_user_stats, record_dataset_outcome, release_archived
+
+from .helpers import login
+
+USER = ObjectId()
+
+
+def _dataset(**fields) -> ObjectId:
+    doc = {"user_id": USER, "status": "done", "row_count": 10, "size_bytes": 100,
+           "archived_at": None, **fields}
+    return db.datasets_infos.insert_one(doc).inserted_id
+
+
+def _stats():
+    stats = db.user_stats.find_one({"_id": USER}) or {}
+    return {k: stats.get(k, 0)
+            for k in ("dataset_count", "total_rows", "total_bytes", "failed_count")}
+
+
+def test_outcome_counted_once():
+    done, failed = _dataset(), _dataset(status="failed")
+
+    for _ in range(2):  # retry Celery, re-livraison...
+        record_dataset_outcome(db, done, "done")
+        record_dataset_outcome(db, failed, "failed")
+
+    assert _stats() == {"dataset_count": 1, "total_rows": 10, "total_bytes": 100,
+                        "failed_count": 1}
+
+
+def test_archived_dataset_is_not_counted():
+    record_dataset_outcome(db, _dataset(archived_at="2024-01-01"), "done")
+
+    assert _stats()["dataset_count"] == 0
+
+
+def test_release_archived_once():
+    a, b = _dataset(archive_token="t"), _dataset(archive_token="t", row_count=5)
+    record_dataset_outcome(db, a, "done")
+    record_dataset_outcome(db, b, "done")
+
+    for _ in range(2):
+        release_archived(db, USER, {"archive_token": "t"})
+
+    assert _stats() == {"dataset_count": 0, "total_rows": 0, "total_bytes": 0,
+                        "failed_count": 0}
+
+
+def test_backfill_counts_legacy_datasets_once():
+    _dataset()
+    _dataset(status="failed")
+    _dataset(archived_at="2024-01-01")
+    _dataset(status="analyzing")
+    counted = _dataset(usage_counted=True)
+
+    assert backfill_user_stats(db) == 2
+    assert backfill_user_stats(db) == 0
+    assert _stats() == {"dataset_count": 1, "total_rows": 10, "total_bytes": 100,
+                        "failed_count": 1}
+    assert "usage_backfill" not in db.datasets_infos.find_one({"_id": counted})
+
+
+def test_stats_endpoint_is_admin_only(client, auth):
+    user = login(client, "user@example.com")
+
+    assert client.get("/users/stats", headers=user).status_code == 403
+    assert client.get("/users/stats", headers=auth).status_code == 200
@@ -17,6 +17,28 @@ export async function listDatasets(
   return res.json();
 }
 
+type CsvError = { line: number; message: string; expected?: number; found?: number };
+
+// Erreurs de validation CSV renvoyées ligne par ligne par l'API
+async function uploadErrorMessage(res: Response): Promise<string> {
+  const text = await res.text();
+  try {
+    const detail = JSON.parse(text).detail;
+    if (typeof detail === "string") return detail;
+    if (detail?.errors) {
+      const lines = (detail.errors as CsvError[]).map(
+        (e) =>
+          `Ligne ${e.line}: ${e.message}` +
+          (e.expected !== undefined ? ` (${e.found}/${e.expected})` : "")
+      );
+      return [detail.message, ...lines].join("\n");
+    }
+  } catch {
+    // réponse non JSON: on renvoie le texte brut
+  }
+  return text;
+}
+
 export async function uploadDataset(
   token: string,
   file: File,
@@ -31,7 +53,7 @@ export async function uploadDataset(
     headers: { Authorization: `Bearer ${token}` },
     body: fd,
   });
-  if (!res.ok) throw new Error(await res.text());
+  if (!res.ok) throw new Error(await uploadErrorMessage(res));
   return res.json();
 }
 
@@ -68,3 +90,15 @@ export async function deleteDataset(
   if (!res.ok) throw new Error(`deleteDataset failed: ${res.status}`);
   return res.json();
 }
+
+export async function cancelDataset(
+  token: string,
+  datasetId: string
+): Promise<{ dataset_id: string; status: string }> {
+  const res = await fetch(`${API_URL}/datasets/${datasetId}/cancel`, {
+    method: "POST",
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  if (!res.ok) throw new Error(`cancelDataset failed: ${res.status}`);
+  return res.json();
+}
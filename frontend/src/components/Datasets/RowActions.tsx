@@ -6,6 +6,8 @@ type Props = {
   onInfo: () => void;
   onNextStep: () => void;
   onArchive: () => void;
+  /** présent uniquement si le traitement est en cours */
+  onCancel?: () => void;
 };
 
 type Pos = { top: number; left: number };
@@ -17,6 +19,7 @@ export const RowActions: React.FC<Props> = ({
   onInfo,
   onNextStep,
   onArchive,
+  onCancel,
 }) => {
   const [open, setOpen] = useState(false);
   const [pos, setPos] = useState<Pos>({ top: 0, left: 0 });
@@ -111,6 +114,18 @@ export const RowActions: React.FC<Props> = ({
             >
               Étape suivante
             </button>
+            {onCancel && (
+              <button
+                className={styles.item}
+                role="menuitem"
+                onClick={() => {
+                  setOpen(false);
+                  onCancel();
+                }}
+              >
+                Annuler le traitement
+              </button>
+            )}
             <div className={styles.sep} />
             <button
               className={`${styles.item} ${styles.danger}`}
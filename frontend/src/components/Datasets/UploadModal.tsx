@@ -80,6 +80,13 @@ export const UploadModal: React.FC<Props> = ({
           stopPolling();
           return;
         }
+        if (s.status === "cancelled") {
+          setError("Le traitement a été annulé.");
+          setDone(true);
+          stopPolling();
+          onUploaded();
+          return;
+        }
 
         // Timeout si ça reste coincé (p.ex. task non enregistrée côté worker)
         const elapsed = Date.now() - (pollStartRef.current ?? Date.now());
@@ -1,7 +1,11 @@
 import { useCallback, useEffect, useState } from "react";
 import { useAuth } from "../auth/AuthContext";
-import { listDatasets, deleteDataset } from "../api/datasets";
-import type { DatasetInfo } from "../types/datasets";
+import {
+  listDatasets,
+  deleteDataset,
+  cancelDataset,
+} from "../api/datasets";
+import type { DatasetInfo, DatasetStatus } from "../types/datasets";
 import styles from "./css/Datasets.module.css";
 import { UploadModal } from "../components/Datasets/UploadModal";
 import { RowActions } from "../components/Datasets/RowActions";
@@ -9,6 +13,8 @@ import { DatasetInfoModal } from "../components/Datasets/DatasetInfoModal";
 import { ConfirmModal } from "../components/common/ConfirmModal";
 import { statusLabel, stepLabel } from "../utils/labels";
 
+const IN_PROGRESS: DatasetStatus[] = ["queued", "uploading_hdfs", "analyzing"];
+
 export const Datasets: React.FC = () => {
   const { token } = useAuth();
   const [items, setItems] = useState<DatasetInfo[]>([]);
@@ -60,6 +66,16 @@ export const Datasets: React.FC = () => {
     }
   };
 
+  const doCancel = async (id: string) => {
+    if (!token) return;
+    try {
+      await cancelDataset(token, id);
+      await load();
+    } catch (e: unknown) {
+      alert(e instanceof Error ? e.message : "Annulation échouée");
+    }
+  };
+
   const closeConfirm = () => {
     setConfirmOpen(false);
     setPendingArchiveId(null);
@@ -137,6 +153,11 @@ export const Datasets: React.FC = () => {
                         alert("Étape suivante bientôt disponible")
                       }
                       onArchive={() => askArchive(d.id)}
+                      onCancel={
+                        IN_PROGRESS.includes(d.status)
+                          ? () => void doCancel(d.id)
+                          : undefined
+                      }
                     />
                   </td>
                 </tr>
@@ -4,6 +4,7 @@ export const DatasetStatus = {
   ANALYZING: "analyzing",
   DONE: "done",
   FAILED: "failed",
+  CANCELLED: "cancelled",
 } as const;
 
 export type DatasetStatus = (typeof DatasetStatus)[keyof typeof DatasetStatus];
@@ -35,6 +36,9 @@ export type DatasetAnalysis = {
   bad_type_counts?: Record<string, number>;
   distinct_counts?: Record<string, number>;
   constant_columns?: string[];
+  /** Pearson entre colonnes numériques (null si indéfini) */
+  correlations?: { columns: string[]; matrix: (number | null)[][] };
+  duplicate_row_count?: number;
   suggestions?: string[];
 };
 
@@ -8,6 +8,7 @@ export const statusLabel: Record<DatasetStatus, string> = {
   analyzing: "Analyse en cours",
   done: "Terminé",
   failed: "Échec",
+  cancelled: "Annulé",
 };
 
 export const stepLabel: Record<DatasetStep, string> = {
@@ -20,6 +21,8 @@ export const statusClass = (s: DatasetStatus) => {
       return "badgeGreen";
     case "failed":
       return "badgeRed";
+    case "cancelled":
+      return "cancelled";
     case "analyzing":
       return "badgeBlue";
     case "uploading_hdfs":